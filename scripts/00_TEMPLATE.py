@@ -8,13 +8,23 @@ Instructions:
 1. Copy this file and rename it (e.g., 03_my_analysis.py)
 2. Update INPUT_CSV to read from the previous script's output
 3. Update OUTPUT_CSV with a new name for this script's output
-4. Add your processing logic in STEP 2
+4. Add your processing logic in process()
 5. Run scripts in order: 01 → 02 → 03 → ... → 22
+   (or all at once with: python scripts/run_pipeline.py)
+
+Reading the input and saving the output is done for you by run_script()
+(pipeline/stage.py). run_pipeline.py calls process() directly instead,
+passing the previous script's table in memory.
 """
 
-import pandas as pd
 from pathlib import Path
 
+# pandas / numpy / matplotlib are only really imported when first used
+from pipeline.bootstrap import np, pd, plt  # noqa: F401
+from pipeline.stage import run_script
+# log() prints at the level set with PIPELINE_VERBOSITY (quiet/batch/verbose/debug)
+from pipeline.verbosity import log
+
 # ============================================================================
 # CONFIGURATION - UPDATE THESE FOR EACH SCRIPT
 # ============================================================================
@@ -23,54 +33,67 @@ from pathlib import Path
 INPUT_CSV = Path(__file__).parent.parent / "outputs" / "XX_previous_output.csv"
 
 # Output: What should this script save?
+# (The file format is set per run with PIPELINE_FORMAT; see pipeline/stage_io.py)
 OUTPUT_CSV = Path(__file__).parent.parent / "outputs" / "XX_your_output.csv"
 # Add more outputs if needed (graphs, text files, etc.)
 # OUTPUT_GRAPH = Path(__file__).parent.parent / "outputs" / "XX_graph.png"
 
-# ============================================================================
-# STEP 1: READ DATA
-# ============================================================================
-print("=" * 80)
-print(f"SCRIPT XX: [Describe what this script does]")
-print("=" * 80)
+# Big inputs: run_pipeline.py --chunk-rows N can feed process() in chunks.
+# Set ROW_LOCAL = True if process() treats every row on its own (no groupby,
+# sorting, shifting, ...). For aggregations, add a combine() function instead.
+ROW_LOCAL = False
+
+# Read only what process() needs (None = everything). Parquet inputs then skip
+# the other columns and any row groups outside the filters without reading them.
+INPUT_COLUMNS = None  # e.g. ["year", "cement_t", "scope1_t", "scope2_t", "scope3_t", "total_t"]
+INPUT_FILTERS = None  # e.g. [("year", ">=", 2000)]
 
-# Check if input exists
-if not INPUT_CSV.exists():
-    print(f"ERROR: Input file not found: {INPUT_CSV}")
-    print("Make sure to run the previous script first!")
-    exit(1)
+# Columns process() relies on, with their dtype ("int"/"float" = any size).
+# Reading stops with a clear error if the input doesn't match.
+INPUT_SCHEMA = None  # e.g. {"year": "int", "total_t": "float"}
+
+# With --compact, integer columns stay at least int32 (smaller ones overflow
+# silently in calculations). List columns that may be int8/int16 anyway:
+COMPACT_SMALL_INTS = []  # e.g. ["year"]
 
-# Read data from previous step
-df = pd.read_csv(INPUT_CSV)
-print(f"Loaded data: {df.shape[0]} rows, {df.shape[1]} columns")
 
 # ============================================================================
-# STEP 2: YOUR PROCESSING LOGIC HERE
+# YOUR PROCESSING LOGIC HERE
 # ============================================================================
-print("\nProcessing data...")
+def process(df):
+    """Take the previous script's table and return this script's table."""
+    log("\nProcessing data...")
 
-# TODO: Add your analysis code here
-result_df = df.copy()
-# Example:
-# result_df['new_column'] = df['old_column'] * 2
-# result_df = result_df.groupby('category').sum()
+    # TODO: Add your analysis code here
+    # No df.copy() needed: process() gets its own copy-on-write table, so
+    # adding or changing a column only copies that column.
+    result_df = df
+    # Example:
+    # result_df['new_column'] = df['old_column'] * 2
+    # result_df = result_df.groupby('category').sum()
 
-print(f"Processing complete: {len(result_df)} rows")
+    # If you create graphs or other outputs:
+    # (plt comes from pipeline.bootstrap: saves files, never opens a window)
+    # plt.figure()
+    # plt.plot(result_df['x'], result_df['y'])
+    # plt.savefig(OUTPUT_GRAPH)
+    # log(f"✓ Saved: {OUTPUT_GRAPH}")
+
+    log(f"Processing complete: {len(result_df)} rows")
+    return result_df
 
-# ============================================================================
-# STEP 3: SAVE OUTPUTS
-# ============================================================================
-print("\nSaving outputs...")
 
-# Save main CSV output
-result_df.to_csv(OUTPUT_CSV, index=False)
-print(f"✓ Saved: {OUTPUT_CSV}")
+# For aggregations in chunked runs: process() returns a partial result per
+# chunk and combine() merges them. Example for a per-year total:
+#
+# def process(df):
+#     return df.groupby('year', as_index=False)['total_t'].sum()
+#
+# def combine(partials):
+#     return pd.concat(partials).groupby('year', as_index=False)['total_t'].sum()
 
-# If you create graphs or other outputs:
-# import matplotlib.pyplot as plt
-# plt.figure()
-# plt.plot(result_df['x'], result_df['y'])
-# plt.savefig(OUTPUT_GRAPH)
-# print(f"✓ Saved: {OUTPUT_GRAPH}")
 
-print("\n✓ DONE! Ready for next script.")
+if __name__ == "__main__":
+    # Reads INPUT_CSV, calls process(), saves OUTPUT_CSV and prints how long
+    # each step took - nothing to change here (see pipeline/stage.py)
+    run_script(__name__)
@@ -1,7 +1,14 @@
-import pandas as pd
-import numpy as np
 from pathlib import Path
 
+from pipeline.column_resolver import ALIASES_PATH, resolve_columns
+from pipeline.emissions import compute_scopes, missing_columns
+from pipeline.excel_cache import cache_path, read_cached_frame, write_cached_frame
+from pipeline.excel_loader import (Workbook, build_frame, header_pairs, iter_sheet_chunks, preview,
+                                   probe_dual_header)
+from pipeline.schema import frame_units
+from pipeline.stage import run_script
+from pipeline.verbosity import DEBUG, QUIET, VERBOSE, banner, enabled, log
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -9,6 +16,10 @@ from pathlib import Path
 INPUT_PATH = Path(__file__).parent.parent / "data" / "Paper_Data.xlsx"
 OUTPUT_CSV = Path(__file__).parent.parent / "outputs" / "01_outputs_historical_scopes.csv"
 
+# Extra column names learned for the automatic matching. Listed as an input so
+# --incremental / --memo rerun this script when an alias is added.
+INPUT_ALIASES = ALIASES_PATH
+
 # Flag: assume calcination EF is per ton clinker (True) or per ton cement (False)
 CALC_EF_IS_PER_CLINKER = True
 
@@ -16,89 +27,190 @@ CALC_EF_IS_PER_CLINKER = True
 OVERLOAD_FRAC = 0.60
 ALLOWED_FRAC = 0.40
 
-# ============================================================================
-# STEP 1: INSPECT FILE STRUCTURE
-# ============================================================================
-print("=" * 80)
-print("STEP 1: FILE INSPECTION")
-print("=" * 80)
-
-# Read Excel to inspect sheets and headers
-excel_file = pd.ExcelFile(INPUT_PATH)
-sheet_names = excel_file.sheet_names
-print(f"\nAvailable sheets: {sheet_names}")
-
-# Use first sheet if not sure
-sheet_name = sheet_names[0]
-print(f"Using sheet: '{sheet_name}'")
+# Which sheet to read (None = first sheet) and how to treat the header rows:
+# "auto" detects a units row, "dual" forces 2 header rows, "single" forces 1
+SHEET_NAME = None
+HEADER_STRATEGY = "auto"
+
+# Reuse the parsed sheet from outputs/cache/ while the workbook is unchanged
+USE_CACHE = True
+
+# For very large sheets: stream the rows in chunks of this size instead of
+# loading the whole sheet (e.g. 100_000). None = load everything at once.
+STREAM_CHUNK_ROWS = None
+
+# A streamed chunk cannot see the whole column, so numbers come back as
+# float64. The columns that are read as whole numbers when the sheet is
+# loaded at once get their type here (by their name in the file), so a
+# streamed run saves the same dtypes. Give "str" to a column that mixes
+# numbers and text.
+STREAM_DTYPES = {
+    "Fiscal Year - July - June": "int64",
+    "Total Exports-Tons": "int64",
+    "Coal intensity - (kg coal / ton cement)": "int64",
+    "Electricity intensity - (kWh / ton cement)": "int64",
+    "Coal parameters: Oxidized carbon fraction": "int64",
+    "Local Transport distances - (km) ": "int64",
+    "North Export Transport distances - (km) ": "int64",
+    "South Export Transport distances- (km) ": "int64",
+}
 
-# Read first few rows to detect header structure
-df_raw = pd.read_excel(INPUT_PATH, sheet_name=sheet_name, nrows=5)
-print(f"\nFirst 5 rows (raw):\n{df_raw}\n")
-print(f"Column names: {df_raw.columns.tolist()}\n")
+# process() only renames columns and adds per-row emissions, so
+# run_pipeline.py --chunk-rows may feed it the sheet in chunks
+ROW_LOCAL = True
+
+
+def parse_workbook():
+    """Parse the Excel sheet and return (df, header_info)."""
+    # ============================================================================
+    # STEP 1: INSPECT FILE STRUCTURE
+    # ============================================================================
+    banner("STEP 1: FILE INSPECTION")
+
+    # Parse the workbook once; every step below slices the in-memory grid
+    workbook = Workbook(INPUT_PATH)
+    sheet_names = workbook.sheet_names
+    log(f"\nAvailable sheets: {sheet_names}", VERBOSE)
+
+    # Use first sheet if not sure
+    sheet_name = sheet_names[0] if SHEET_NAME is None else SHEET_NAME
+    log(f"Using sheet: '{sheet_name}'")
+    grid = workbook.grid(sheet_name)
+
+    # Look at the first few rows to detect header structure
+    # (only built with PIPELINE_VERBOSITY=debug: printing tables is slow for wide sheets)
+    if enabled(DEBUG):
+        df_raw = preview(grid, nrows=5)
+        log(f"\nFirst 5 rows (raw):\n{df_raw}\n", DEBUG)
+        log(f"Column names: {df_raw.columns.tolist()}\n", DEBUG)
+
+    # ============================================================================
+    # STEP 2: HANDLE HEADERS & READ FULL DATA
+    # ============================================================================
+    banner("STEP 2: READ FULL DATA & HANDLE HEADERS")
+
+    # Detect if there are two header rows: keep the second row only if it looks like units
+    if HEADER_STRATEGY == "auto":
+        has_dual_header = probe_dual_header(grid)
+    else:
+        has_dual_header = HEADER_STRATEGY == "dual"
+
+    if has_dual_header:
+        log("Using 2-row header (name + units)...")
+        if enabled(DEBUG):
+            log(f"Multi-index columns:\n{header_pairs(grid, dual_header=True)}\n", DEBUG)
+    else:
+        log("Using single header row.\n")
+
+    # Build the full table from the same grid (2-row headers are flattened to name_unit)
+    df = build_frame(grid, dual_header=has_dual_header)
+
+    header_info = {
+        "sheet_name": sheet_name,
+        "dual_header": has_dual_header,
+        "header_pairs": header_pairs(grid, dual_header=has_dual_header),
+    }
+    return df, header_info
+
+
+def load():
+    """Return the parsed sheet, from the cache when the workbook is unchanged."""
+    cache_file = cache_path(INPUT_PATH, SHEET_NAME, HEADER_STRATEGY) if USE_CACHE else None
+    cached = read_cached_frame(cache_file) if cache_file else None
+
+    if cached is not None:
+        df, header_info = cached
+        banner("STEP 1-2: LOADED PARSED DATA FROM CACHE")
+        log(f"Cache file: {cache_file}", VERBOSE)
+        log(f"Sheet: '{header_info['sheet_name']}', 2-row header: {header_info['dual_header']}\n")
+    else:
+        df, header_info = parse_workbook()
+        if cache_file:
+            write_cached_frame(cache_file, df, header_info)
+            log(f"Cached parsed data: {cache_file}\n", VERBOSE)
+
+    log(f"Data shape: {df.shape}")
+    if enabled(VERBOSE):
+        log(f"\nAll columns in file:\n{df.columns.tolist()}\n", VERBOSE)
+    if enabled(DEBUG):
+        log(f"First 3 data rows:\n{df.head(3)}\n", DEBUG)
+        log(f"Data types:\n{df.dtypes}\n", DEBUG)
+    return df
 
-# ============================================================================
-# STEP 2: HANDLE HEADERS & READ FULL DATA
-# ============================================================================
-print("=" * 80)
-print("STEP 2: READ FULL DATA & HANDLE HEADERS")
-print("=" * 80)
-
-# Try to detect if there are two header rows by reading with multiindex
-try:
-    df_check = pd.read_excel(INPUT_PATH, sheet_name=sheet_name, header=[0, 1], nrows=2)
-    # If second row looks like units, keep it; otherwise use single header
-    print("Attempting to read with 2-row header...")
-    print(f"Multi-index columns:\n{df_check.columns.tolist()}\n")
-    has_dual_header = True
-except Exception as e:
-    print(f"Could not parse as dual header: {e}")
-    has_dual_header = False
-
-# Read with appropriate header strategy
-if has_dual_header:
-    # Flatten multi-index columns by combining name + unit
-    df = pd.read_excel(INPUT_PATH, sheet_name=sheet_name, header=[0, 1])
-    df.columns = [f"{col[0]}_{col[1]}".strip() if col[1] and col[1] != '' else col[0]
-                  for col in df.columns]
-else:
-    df = pd.read_excel(INPUT_PATH, sheet_name=sheet_name, header=0)
-
-print(f"Data shape: {df.shape}")
-print(f"\nAll columns in file:\n{df.columns.tolist()}\n")
-print(f"First 3 data rows:\n{df.head(3)}\n")
-print(f"Data types:\n{df.dtypes}\n")
 
 # ============================================================================
 # STEP 3: COLUMN MAPPING
 # ============================================================================
-print("=" * 80)
-print("STEP 3: BUILD COLUMN MAPPING")
-print("=" * 80)
-
-# Create a mapping from raw column names to standardized names
-# USER: Please verify/adjust these mappings based on actual column names above
+# Raw column names are matched to standardized names automatically
+# (see pipeline/column_resolver.py). Entries here override the automatic match.
+# USER: Only add mappings for columns that are missing or matched wrongly below
 COLUMN_MAPPING = {
-    # Update these to match your actual column names
     # Example: 'FY' -> 'year', 'Cement Production (tons)' -> 'cement_t', etc.
 }
 
-print("COLUMN_MAPPING (PLEASE VERIFY):")
-print(COLUMN_MAPPING)
-print("\nIf the mappings above are empty or incorrect, please provide the actual")
-print("column names from the file so I can build the correct mapping.\n")
-
-# For now, let's print available columns for user reference
-print("=" * 80)
-print("AVAILABLE COLUMNS (for mapping):")
-print("=" * 80)
-for i, col in enumerate(df.columns):
-    print(f"{i:2d}. '{col}'")
-
-print("\n" + "=" * 80)
-print("NEXT STEP: Please provide column mapping!")
-print("=" * 80)
-print("""
+
+# The sets of missing columns already explained in this run (see process())
+_reported_missing = set()
+
+
+def rename_columns(df, mapping):
+    """Rename columns with `mapping`; units from the Excel header follow their column."""
+    renamed = df.rename(columns=mapping)
+    renamed.attrs["units"] = {mapping.get(name, name): unit for name, unit in frame_units(df).items()}
+    return renamed
+
+
+def add_emissions(mapped_df):
+    """Add the Scope 1/2/3 columns using this script's settings."""
+    return compute_scopes(
+        mapped_df,
+        calc_ef_is_per_clinker=CALC_EF_IS_PER_CLINKER,
+        overload_frac=OVERLOAD_FRAC,
+        allowed_frac=ALLOWED_FRAC,
+    )
+
+
+def process(df):
+    """Rename columns with COLUMN_MAPPING and add Scope 1/2/3 emissions once all are mapped."""
+    banner("STEP 3: BUILD COLUMN MAPPING")
+
+    # Automatic matches first, then the manual COLUMN_MAPPING on top
+    auto_mapping, _ = resolve_columns(df.columns)
+    mapping = {**auto_mapping, **COLUMN_MAPPING}
+    if enabled(VERBOSE):
+        log("Column mapping used:", VERBOSE)
+        for raw, canonical in mapping.items():
+            log(f"  {canonical:20s} <- '{raw}'", VERBOSE)
+        log("", VERBOSE)
+
+    mapped_df = rename_columns(df, mapping)
+    missing = missing_columns(mapped_df)
+    if not missing:
+        # ====================================================================
+        # STEP 4: SCOPE 1/2/3 EMISSIONS
+        # ====================================================================
+        log("All required columns are mapped, calculating Scope 1/2/3 emissions...")
+        scopes_df = add_emissions(mapped_df)
+        log(f"✓ Emissions calculated for {len(scopes_df)} rows")
+        return scopes_df
+
+    # When streaming, process() runs once per chunk: explain the missing columns only once
+    if tuple(missing) in _reported_missing:
+        return mapped_df
+    _reported_missing.add(tuple(missing))
+
+    log(f"Could not match these columns automatically: {missing}", QUIET)
+    log("\nPlease add them to COLUMN_MAPPING (or to data/column_aliases.json)")
+    log("using the actual column names from the file.\n")
+
+    # For now, let's print available columns for user reference
+    banner("AVAILABLE COLUMNS (for mapping):")
+    for i, col in enumerate(df.columns):
+        log(f"{i:2d}. '{col}'")
+
+    log()
+    banner("NEXT STEP: Please provide column mapping!")
+    log("""
 Please tell me which columns correspond to:
   - year / fiscal year
   - cement_t (total cement production)
@@ -117,3 +229,20 @@ Please tell me which columns correspond to:
   - ef_allowed_gpkm, ef_over_gpkm (truck emissions factors)
   - dist_local_km, dist_exp_n_km, dist_exp_s_km (distances)
 """)
+    # Saved with the columns that were matched renamed, so the next run only needs the rest
+    return mapped_df
+
+
+def load_chunks(chunk_rows):
+    """Yield the sheet in chunks of up to chunk_rows rows, without loading it all."""
+    return iter_sheet_chunks(INPUT_PATH, SHEET_NAME, chunk_rows, HEADER_STRATEGY, dtypes=STREAM_DTYPES)
+
+
+def main():
+    # load() (or load_chunks() when streaming), process(), then save the parsed
+    # table so script 02 can start from it
+    run_script(__name__, chunk_rows=STREAM_CHUNK_ROWS)
+
+
+if __name__ == "__main__":
+    main()
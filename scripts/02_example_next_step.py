@@ -5,11 +5,19 @@ This script demonstrates the pipeline pattern:
 1. Read the output from the previous script (01_first_analysis.py)
 2. Process the data
 3. Save output for the next script (03_...)
+
+Only step 2 is written here, in process(df). Reading and saving are done by
+run_script() (pipeline/stage.py), so run_pipeline.py can call process()
+directly and hand the result to the next script in memory.
 """
 
-import pandas as pd
 from pathlib import Path
 
+# pandas / numpy / matplotlib are only really imported when first used
+from pipeline.bootstrap import np, pd, plt  # noqa: F401
+from pipeline.stage import run_script
+from pipeline.verbosity import banner, log
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -20,57 +28,46 @@ INPUT_CSV = Path(__file__).parent.parent / "outputs" / "01_outputs_historical_sc
 OUTPUT_CSV = Path(__file__).parent.parent / "outputs" / "02_processed_results.csv"
 OUTPUT_GRAPH = Path(__file__).parent.parent / "outputs" / "02_graph.png"
 
-# ============================================================================
-# STEP 1: READ DATA FROM PREVIOUS SCRIPT
-# ============================================================================
-print("=" * 80)
-print("STEP 1: READING DATA FROM PREVIOUS SCRIPT")
-print("=" * 80)
-
-# Check if input file exists
-if not INPUT_CSV.exists():
-    print(f"ERROR: Input file not found at: {INPUT_CSV}")
-    print("Please run 01_first_analysis.py first!")
-    exit(1)
-
-# Read the CSV output from previous step
-df = pd.read_csv(INPUT_CSV)
-print(f"Loaded data shape: {df.shape}")
-print(f"Columns: {df.columns.tolist()}")
-print(f"\nFirst few rows:\n{df.head()}\n")
+# process() handles each row on its own, so run_pipeline.py --chunk-rows
+# may feed it the input in chunks (set to False if you add e.g. a groupby)
+ROW_LOCAL = True
+
+# Read only what process() needs (None = everything). Parquet inputs then skip
+# the other columns and any row groups outside the filters without reading them.
+INPUT_COLUMNS = None  # e.g. ["year", "cement_t", "scope1_t", "scope2_t", "scope3_t", "total_t"]
+INPUT_FILTERS = None  # e.g. [("year", ">=", 2000)]
+
+# Columns process() relies on, with their dtype ("int"/"float" = any size).
+# Reading stops with a clear error if the input doesn't match.
+INPUT_SCHEMA = None  # e.g. {"year": "int", "total_t": "float"}
+
 
 # ============================================================================
 # STEP 2: PROCESS YOUR DATA
 # ============================================================================
-print("=" * 80)
-print("STEP 2: PROCESSING DATA")
-print("=" * 80)
+def process(df):
+    """Turn the previous script's table into this script's table."""
+    banner("STEP 2: PROCESSING DATA")
 
-# Example: Do some calculations
-# Replace this with your actual analysis
-processed_df = df.copy()
-# ... your processing logic here ...
+    # Example: Do some calculations
+    # Replace this with your actual analysis. No df.copy() needed: process()
+    # gets its own copy-on-write table, so only the columns you change are copied.
+    processed_df = df
+    # ... your processing logic here, e.g.
+    # processed_df = processed_df.assign(total_kt=processed_df["total_t"] / 1000)
 
-print(f"Processed {len(processed_df)} rows")
+    # If you create graphs, save them too
+    # (plt comes from pipeline.bootstrap: saves files, never opens a window)
+    # plt.figure()
+    # ... create your graph ...
+    # plt.savefig(OUTPUT_GRAPH)
+    # log(f"✓ Saved graph to: {OUTPUT_GRAPH}")
 
-# ============================================================================
-# STEP 3: SAVE OUTPUTS FOR NEXT SCRIPT
-# ============================================================================
-print("=" * 80)
-print("STEP 3: SAVING OUTPUTS")
-print("=" * 80)
-
-# Save CSV output (for next script to read)
-processed_df.to_csv(OUTPUT_CSV, index=False)
-print(f"✓ Saved CSV to: {OUTPUT_CSV}")
-
-# If you create graphs, save them too
-# import matplotlib.pyplot as plt
-# plt.figure()
-# ... create your graph ...
-# plt.savefig(OUTPUT_GRAPH)
-# print(f"✓ Saved graph to: {OUTPUT_GRAPH}")
-
-print("\n" + "=" * 80)
-print("DONE! Output files are ready for the next script.")
-print("=" * 80)
+    log(f"Processed {len(processed_df)} rows")
+    return processed_df
+
+
+if __name__ == "__main__":
+    # Reads INPUT_CSV, calls process(), saves OUTPUT_CSV and times every step
+    # (the same code run_pipeline.py uses; see pipeline/stage.py)
+    run_script(__name__)
@@ -0,0 +1,58 @@
+"""
+Time the pipeline on synthetic data of growing size.
+
+Synthetic workbooks and tables shaped like data/Paper_Data.xlsx are
+generated for each size; ingestion, every script and the whole chain are
+timed several times, and the results are saved to outputs/benchmarks/ so
+you can compare runs later.
+
+Usage:
+    python scripts/benchmark.py                              # 10, 1,000 and 100,000 rows
+    python scripts/benchmark.py --sizes 10 1000000 10000000  # up to 10 million rows
+    python scripts/benchmark.py --repeats 5 --format feather
+    python scripts/benchmark.py --to 5                       # only scripts 01-05
+"""
+
+import argparse
+
+from pipeline.benchmark import (DEFAULT_SIZES, MAX_WORKBOOK_ROWS, print_results, run_benchmarks,
+                                save_results)
+from pipeline.runner import discover_stages, stage_number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="numbers of rows to test (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="how often to time each step (5+ gives tighter intervals in compare_benchmarks.py)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed rounds before the timed ones")
+    parser.add_argument("--from", dest="first", type=int, default=1, help="first script number to run")
+    parser.add_argument("--to", dest="last", type=int, default=99, help="last script number to run")
+    parser.add_argument("--format", choices=["parquet", "feather", "csv"],
+                        help="file format for saved tables (default: $PIPELINE_FORMAT or parquet)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes for ingestion (default: all CPUs)")
+    parser.add_argument("--max-workbook-rows", type=int, default=MAX_WORKBOOK_ROWS,
+                        help="largest size that also gets an Excel workbook (writing Excel is slow)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the synthetic data")
+    parser.add_argument("--output", help="results file (default: outputs/benchmarks/benchmark-<time>.json)")
+    args = parser.parse_args()
+
+    stages = [path for path in discover_stages() if args.first <= stage_number(path) <= args.last]
+    results = run_benchmarks(args.sizes, stages, repeats=args.repeats, fmt=args.format, jobs=args.jobs,
+                             max_workbook_rows=args.max_workbook_rows, seed=args.seed, warmup=args.warmup)
+
+    print("\n" + "=" * 80)
+    print("BENCHMARK RESULTS")
+    print("=" * 80)
+    print_results(results)
+
+    settings = {key: value for key, value in vars(args).items() if key != "output"}
+    settings["stages"] = [path.name for path in stages]
+    path = save_results(results, settings, args.output)
+    print(f"\n✓ Saved results to: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Check a benchmark run against a baseline and fail if something got slower.
+
+Both files come from scripts/benchmark.py. For every size and step the
+median times are compared; a step counts as a regression only if it is
+slower by more than the threshold across the whole confidence interval
+(use --repeats 5 or more in the benchmark for tight intervals).
+Exits with code 1 when there is a regression, so it can guard a commit.
+
+Usage:
+    python scripts/compare_benchmarks.py outputs/benchmarks/baseline.json outputs/benchmarks/benchmark-20240101-120000.json
+    python scripts/compare_benchmarks.py baseline.json new.json --threshold 5   # fail above +5%
+"""
+
+import argparse
+import sys
+
+from pipeline.benchmark import compare_results, load_results, print_comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark results files.")
+    parser.add_argument("baseline", help="results file to compare against")
+    parser.add_argument("candidate", help="results file of the new code")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="allowed slowdown in percent before a step counts as a regression")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of the intervals")
+    parser.add_argument("--min-seconds", type=float, default=0.005,
+                        help="steps faster than this in both runs are never flagged (too noisy)")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    if baseline.get("machine", {}).get("host") != candidate.get("machine", {}).get("host"):
+        print("WARNING: the two runs come from different machines; times may not be comparable.\n")
+
+    rows = compare_results(baseline, candidate, threshold=args.threshold / 100,
+                           confidence=args.confidence, min_seconds=args.min_seconds)
+    print_comparison(rows)
+
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n✗ {len(regressions)} step(s) slower by more than {args.threshold:g}%:")
+        for row in regressions:
+            print(f"  {row['name']} at {row['size']:,} rows: {row['change']:+.1%}")
+        sys.exit(1)
+    print(f"\n✓ No step slower by more than {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Read many plant workbooks into one table.
+
+Every sheet of every workbook is parsed in parallel, its columns are
+matched to the standard names, and the rows are tagged with `plant` and
+`sheet`. The combined table is saved like any other stage output.
+
+Usage:
+    python scripts/ingest_workbooks.py "data/plants/*.xlsx"
+    python scripts/ingest_workbooks.py data/plants/manifest.csv --jobs 8
+    python scripts/ingest_workbooks.py "data/*.xlsx" --output outputs/00_all_plants.csv
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from pipeline.ingest import ingest_workbooks
+from pipeline.stage_io import write_frame
+
+DEFAULT_OUTPUT = Path(__file__).parent.parent / "outputs" / "00_ingested_workbooks.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse many workbooks into one table.")
+    parser.add_argument("source", help="glob pattern (quote it) or manifest CSV with a 'path' column")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT,
+                        help="where to save the combined table (suffix follows PIPELINE_FORMAT)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--header", choices=["auto", "dual", "single"], default="auto",
+                        help="header rows: detect automatically, or force 2 or 1")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the Excel files")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table, failures = ingest_workbooks(args.source, workers=args.jobs,
+                                       header_strategy=args.header, use_cache=not args.no_cache)
+
+    print(f"Read {table['plant'].nunique()} plants, {len(table)} rows "
+          f"in {time.perf_counter() - start:.2f} s")
+    for failure in failures:
+        print(f"  FAILED: {failure}")
+
+    saved_path = write_frame(table, args.output)
+    print(f"✓ Saved: {saved_path}")
+    if failures:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""
+Shared helpers for the numbered pipeline scripts.
+
+The scripts in scripts/ import from here, e.g.:
+
+    from pipeline.excel_loader import Workbook
+
+This works because Python puts the scripts/ folder on the import path
+when you run `python scripts/NN_something.py`.
+"""
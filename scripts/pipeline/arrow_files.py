@@ -0,0 +1,85 @@
+"""
+Reading and writing uncompressed Arrow IPC files.
+
+The Excel cache (excel_cache.py), the hand-off between worker processes
+(handoff.py) and the memo cache (memo.py) all keep tables this way:
+written once, then opened memory-mapped so pandas can use the column
+buffers in the file instead of copying them.
+
+    table = arrow_table(df, metadata={b"key": b"value"})
+    write_arrow(table, path)
+    df = table_to_frame(open_arrow(path))
+
+Writes go to a temporary file that is renamed at the end, so a reader
+never sees a half-written file. open_arrow() raises pyarrow.ArrowInvalid
+or OSError for a damaged file; callers decide whether that is an error or
+a cache miss.
+"""
+
+import os
+from pathlib import Path
+
+from pipeline.bootstrap import pd
+from pipeline.instrument import count_read, count_written
+from pipeline.verbosity import VERBOSE, log
+
+
+def arrow_safe(df):
+    """
+    Make object columns storable in Arrow (Parquet, Feather, IPC), as the type they come back as.
+
+    A column that mixes numbers and text (e.g. 12.5 and "n/a" from Excel)
+    becomes text; one holding only numbers becomes a number column. Missing
+    values stay missing.
+    """
+    changed = {}
+    for name in df.columns:
+        col = df[name]
+        if not pd.api.types.is_object_dtype(col):
+            continue
+        kind = pd.api.types.infer_dtype(col, skipna=True)
+        if kind in ("mixed", "mixed-integer"):
+            changed[name] = col.where(col.isna(), col.astype(str))
+            log(f"Column '{name}' has both numbers and text: saved as text", VERBOSE)
+        elif kind in ("integer", "floating", "mixed-integer-float"):
+            changed[name] = pd.to_numeric(col)
+    return df.assign(**changed) if changed else df
+
+
+def arrow_table(df, metadata=None):
+    """`df` as a pyarrow Table (without the index), with extra schema `metadata` ({bytes: bytes})."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(arrow_safe(df), preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    return table
+
+
+def write_arrow(table, path):
+    """Write a pyarrow Table (see arrow_table) to `path` and return the path."""
+    import pyarrow as pa
+
+    path = Path(path)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    tmp_path.replace(path)
+    count_written(path)
+    return path
+
+
+def open_arrow(path):
+    """Open an Arrow IPC file memory-mapped and return its pyarrow Table."""
+    import pyarrow as pa
+
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    count_read(path)
+    return table
+
+
+def table_to_frame(table):
+    """A DataFrame over the table's buffers: split_blocks keeps one block per column, so nothing is consolidated (copied)."""
+    return table.to_pandas(split_blocks=True)
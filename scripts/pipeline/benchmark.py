@@ -0,0 +1,276 @@
+"""
+Benchmarks: how the pipeline scales with the number of rows.
+
+For each size, synthetic data (see pipeline/synthetic.py) is written to a
+scratch folder and the stage scripts are pointed at it instead of data/
+and outputs/. After `warmup` untimed rounds (the first run of anything in
+a fresh process is slower: imports, disk cache), `repeats` times:
+
+    ingest      parse the synthetic workbook (pipeline/ingest.py)
+    NN_name.py  each stage, as timed by the runner
+    chain       the whole run_pipeline() call
+
+Workbooks are only written up to `max_workbook_rows` rows (writing Excel
+is slow: about 20 s per 100,000 rows). For bigger sizes the scripts that
+read Excel (those with load()) are left out and the scripts after them
+start from a synthetic copy of their output table.
+
+Results are saved as JSON in outputs/benchmarks/, one file per run, so
+runs can be compared later:
+
+    {"created": ..., "machine": {...}, "settings": {...},
+     "results": [{"size": 1000, "name": "chain", "samples_s": [0.41, 0.39, 0.40],
+                  "peak_rss_bytes": 123456789}, ...]}
+
+compare_results() lines up two such files. For every size and step it
+gives the change of the median time with a bootstrap confidence interval,
+and flags a regression only when the whole interval is above the
+threshold, so one noisy repeat does not fail the comparison.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from pipeline.bootstrap import np
+from pipeline.ingest import ingest_workbooks
+from pipeline.memo import MEMO_ENV_VAR
+from pipeline.runner import discover_stages, load_stage, run_pipeline
+from pipeline.stage_io import write_frame
+from pipeline.synthetic import synthetic_frame, synthetic_stage_input, write_workbook
+
+PROJECT_DIR = Path(__file__).parent.parent.parent
+OUTPUTS_DIR = PROJECT_DIR / "outputs"
+DATA_DIR = PROJECT_DIR / "data"
+BENCHMARK_DIR = OUTPUTS_DIR / "benchmarks"
+
+DEFAULT_SIZES = (10, 1_000, 100_000)
+MAX_WORKBOOK_ROWS = 100_000
+
+
+def _is_inside(path, folder):
+    try:
+        Path(path).resolve().relative_to(folder.resolve())
+    except ValueError:
+        return False
+    return True
+
+
+def redirect_stage(module, work_dir, workbook=None):
+    """
+    Point a loaded stage module at `work_dir` instead of outputs/.
+
+    INPUT_*/OUTPUT_* paths inside outputs/ move to `work_dir`, Excel inputs
+    inside data/ become `workbook`, and the stage's Excel cache is turned
+    off so every repeat really parses the workbook.
+    """
+    for name, value in list(vars(module).items()):
+        if not name.startswith(("INPUT_", "OUTPUT_")) or not isinstance(value, (str, Path)):
+            continue
+        if _is_inside(value, OUTPUTS_DIR):
+            setattr(module, name, Path(work_dir) / Path(value).resolve().relative_to(OUTPUTS_DIR.resolve()))
+        elif workbook is not None and _is_inside(value, DATA_DIR) and Path(value).suffix in (".xlsx", ".xls"):
+            setattr(module, name, Path(workbook))
+    if hasattr(module, "USE_CACHE"):
+        module.USE_CACHE = False
+    return module
+
+
+def _timed(function, *args, **kwargs):
+    """Run function(*args, **kwargs) with its printing hidden; return (result, seconds)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _add_sample(results, size, name, seconds, peak_rss_bytes=0):
+    entry = results.setdefault((size, name), {"size": size, "name": name, "samples_s": [], "peak_rss_bytes": 0})
+    entry["samples_s"].append(seconds)
+    entry["peak_rss_bytes"] = max(entry["peak_rss_bytes"], peak_rss_bytes)
+
+
+def benchmark_size(n_rows, stage_paths, repeats=3, fmt=None, jobs=None, max_workbook_rows=MAX_WORKBOOK_ROWS,
+                   seed=0, results=None, warmup=1):
+    """Time ingestion, every stage and the whole chain for `n_rows` rows; return the results dict."""
+    results = {} if results is None else results
+    BENCHMARK_DIR.mkdir(parents=True, exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix=f"work-{n_rows}-", dir=BENCHMARK_DIR))
+    # Remembered results would make every repeat after the first one just a lookup
+    memo_setting = os.environ.pop(MEMO_ENV_VAR, None)
+    try:
+        workbook = None
+        if n_rows <= max_workbook_rows:
+            workbook = write_workbook(synthetic_frame(n_rows, seed), work_dir / f"synthetic_{n_rows}.xlsx")
+
+        modules = [redirect_stage(load_stage(path), work_dir, workbook) for path in stage_paths]
+        if workbook is None:
+            # No workbook to read: the loading scripts' tables are made up directly instead
+            stage_input = synthetic_stage_input(n_rows, seed)
+            for module in modules:
+                if hasattr(module, "load"):
+                    write_frame(stage_input, module.OUTPUT_CSV, fmt)
+            del stage_input
+            kept = [i for i, module in enumerate(modules) if not hasattr(module, "load")]
+            stage_paths = [stage_paths[i] for i in kept]
+            modules = [modules[i] for i in kept]
+
+        for round_number in range(warmup + repeats):
+            # Warm-up rounds are run but not recorded
+            samples = results if round_number >= warmup else {}
+            if workbook is not None:
+                _, seconds = _timed(ingest_workbooks, str(workbook), workers=jobs, use_cache=False)
+                _add_sample(samples, n_rows, "ingest", seconds)
+
+            if stage_paths:
+                report, seconds = _timed(run_pipeline, stage_paths, fmt=fmt, modules=modules)
+                for name, metrics in report.items():
+                    # Peak memory is None where it cannot be measured (Windows)
+                    _add_sample(samples, n_rows, name, metrics["wall_s"], metrics["peak_rss_bytes"] or 0)
+                _add_sample(samples, n_rows, "chain", seconds,
+                            max((metrics["peak_rss_bytes"] or 0 for metrics in report.values()), default=0))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if memo_setting is not None:
+            os.environ[MEMO_ENV_VAR] = memo_setting
+    return results
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stage_paths=None, repeats=3, fmt=None, jobs=None,
+                   max_workbook_rows=MAX_WORKBOOK_ROWS, seed=0, warmup=1):
+    """Benchmark every size and return the results as a list of dicts (see module docstring)."""
+    stage_paths = discover_stages() if stage_paths is None else list(stage_paths)
+    results = {}
+    for n_rows in sizes:
+        print(f"Benchmarking {n_rows:,} rows...")
+        benchmark_size(n_rows, stage_paths, repeats, fmt, jobs, max_workbook_rows, seed, results, warmup)
+    return list(results.values())
+
+
+def machine_info():
+    """Where the benchmark ran, so results from different machines are not mixed up."""
+    import pandas as pd
+
+    return {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_results(results, settings, path=None):
+    """Save benchmark results as JSON (default: outputs/benchmarks/benchmark-<time>.json)."""
+    created = datetime.now()
+    if path is None:
+        path = BENCHMARK_DIR / f"benchmark-{created:%Y%m%d-%H%M%S}.json"
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "created": created.isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "settings": settings,
+        "results": results,
+    }, indent=2))
+    return path
+
+
+def print_results(results):
+    """One line per size and step: median, fastest and slowest time, peak memory."""
+    print(f"  {'rows':>12}  {'step':36s} {'median s':>10} {'min s':>10} {'max s':>10} {'peak MB':>9}")
+    for entry in results:
+        samples = entry["samples_s"]
+        print(f"  {entry['size']:>12,}  {entry['name']:36s} {statistics.median(samples):10.4f} "
+              f"{min(samples):10.4f} {max(samples):10.4f} {entry['peak_rss_bytes'] / 1e6:9.1f}")
+
+
+def load_results(path):
+    """Read a results file written by save_results()."""
+    return json.loads(Path(path).read_text())
+
+
+def _median_ratio_interval(baseline, candidate, confidence, n_resamples, rng):
+    """Bootstrap confidence interval of median(candidate) / median(baseline)."""
+    baseline = np.asarray(baseline, dtype=float)
+    candidate = np.asarray(candidate, dtype=float)
+    base = np.median(rng.choice(baseline, (n_resamples, len(baseline))), axis=1)
+    cand = np.median(rng.choice(candidate, (n_resamples, len(candidate))), axis=1)
+    ratios = cand / base
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(ratios, tail), np.percentile(ratios, 100 - tail)
+
+
+def compare_results(baseline, candidate, threshold=0.10, confidence=0.95, min_seconds=0.005,
+                    n_resamples=2000, seed=0):
+    """
+    Compare two benchmark runs (dicts from load_results) step by step.
+
+    Returns one dict per size and step with the median times, the change
+    (+0.25 = 25% slower), its confidence interval and a status:
+        "regression"  slower by more than `threshold`, for the whole interval
+        "faster"      faster by more than `threshold`, for the whole interval
+        "ok"          no clear change (or too quick to measure: < min_seconds)
+        "new" / "missing"  the step is only in the candidate / the baseline
+    With a single repeat per run the interval is just the measured change.
+    """
+    rng = np.random.default_rng(seed)
+    base_entries = {(entry["size"], entry["name"]): entry for entry in baseline["results"]}
+    cand_entries = {(entry["size"], entry["name"]): entry for entry in candidate["results"]}
+
+    rows = []
+    for key in sorted(base_entries.keys() | cand_entries.keys()):
+        base, cand = base_entries.get(key), cand_entries.get(key)
+        row = {"size": key[0], "name": key[1], "baseline_s": None, "candidate_s": None,
+               "change": None, "low": None, "high": None}
+        if base is None or cand is None:
+            row["status"] = "new" if base is None else "missing"
+            entry = cand if base is None else base
+            row["candidate_s" if base is None else "baseline_s"] = float(np.median(entry["samples_s"]))
+            rows.append(row)
+            continue
+
+        base_median = float(np.median(base["samples_s"]))
+        cand_median = float(np.median(cand["samples_s"]))
+        low, high = _median_ratio_interval(base["samples_s"], cand["samples_s"], confidence, n_resamples, rng)
+        row.update(baseline_s=base_median, candidate_s=cand_median, change=cand_median / base_median - 1,
+                   low=low - 1, high=high - 1)
+
+        if max(base_median, cand_median) < min_seconds:
+            row["status"] = "ok"
+        elif row["low"] > threshold:
+            row["status"] = "regression"
+        elif row["high"] < -threshold:
+            row["status"] = "faster"
+        else:
+            row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def _seconds(value):
+    return f"{value:10.4f}" if value is not None else f"{'-':>10}"
+
+
+def _percent(value):
+    return f"{value:+7.1%}" if value is not None else f"{'-':>7}"
+
+
+def print_comparison(rows):
+    """One line per size and step: both medians, the change and its confidence interval."""
+    print(f"  {'rows':>12}  {'step':30s} {'before s':>10} {'after s':>10} {'change':>7} "
+          f"{'interval':>17}  status")
+    for row in rows:
+        interval = f"[{_percent(row['low'])}, {_percent(row['high'])}]" if row["low"] is not None else ""
+        status = row["status"].upper() if row["status"] == "regression" else row["status"]
+        print(f"  {row['size']:>12,}  {row['name']:30s} {_seconds(row['baseline_s'])} "
+              f"{_seconds(row['candidate_s'])} {_percent(row['change'])} {interval:>17}  {status}")
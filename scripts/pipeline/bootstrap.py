@@ -0,0 +1,126 @@
+"""
+Fast startup: heavy libraries are imported the first time they are used.
+
+Importing pandas, numpy or matplotlib takes a few hundred milliseconds.
+Scripts and helpers import them from here instead:
+
+    from pipeline.bootstrap import np, pd, plt
+
+`pd` looks and works like the pandas module, but pandas is only really
+imported when the script first touches it (e.g. pd.DataFrame). A script
+that only copies files or writes text never pays for it.
+
+enable_copy_on_write() makes pandas 2 behave like pandas 3: DataFrames
+share unchanged columns instead of copying whole tables (the pipeline
+runner switches it on before it hands a table to a script).
+
+Plots are drawn with the non-interactive "Agg" backend, so scripts can
+save figures without opening windows (and run on servers without a
+screen). Set MPLBACKEND yourself to use another backend.
+
+The time each real import took is kept in IMPORT_SECONDS. Inside a
+`with track_imports():` block every other first-time import is timed too
+(e.g. pandas pulled in by pyarrow); the pipeline runner uses this to
+show the import time per script.
+"""
+
+import builtins
+import os
+import sys
+import time
+import types
+from contextlib import contextmanager
+
+# Must be set before matplotlib is imported for the first time
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+# {module name: seconds its import took}, for imports done through lazy_import()
+IMPORT_SECONDS = {}
+
+
+class LazyModule(types.ModuleType):
+    """Stands in for a module and imports it on the first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            start = time.perf_counter()
+            # Through __import__, so track_imports() sees it as one import, not as its parts
+            __import__(self.__name__)
+            module = sys.modules[self.__name__]
+            IMPORT_SECONDS[self.__name__] = time.perf_counter() - start
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded yet"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    """Return module `name`: the module itself if already imported, else a LazyModule."""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def enable_copy_on_write():
+    """
+    Let DataFrames share column data until one of them changes it.
+
+    Always on in pandas 3. In pandas 2 it has to be switched on: then
+    df.assign(), a new column, rename() or a shallow copy no longer copy
+    every column, and changing a column only copies that column.
+
+    Does nothing while pandas has not been imported (so it never imports
+    it); call it again before sharing DataFrames.
+    """
+    pandas = sys.modules.get("pandas")
+    if pandas is not None and int(pandas.__version__.split(".")[0]) < 3:
+        pandas.set_option("mode.copy_on_write", True)
+
+
+def import_seconds():
+    """Total time spent so far on the imports recorded in IMPORT_SECONDS."""
+    return sum(IMPORT_SECONDS.values())
+
+
+@contextmanager
+def track_imports():
+    """Record in IMPORT_SECONDS how long each module first imported inside the block took."""
+    original_import = builtins.__import__
+    depth = 0
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        nonlocal depth
+        if depth or level or name in sys.modules:
+            return original_import(name, globals, locals, fromlist, level)
+        # Only the outermost import is timed; it includes the modules it imports itself
+        depth += 1
+        start = time.perf_counter()
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            depth -= 1
+            IMPORT_SECONDS[name] = IMPORT_SECONDS.get(name, 0.0) + time.perf_counter() - start
+
+    builtins.__import__ = timed_import
+    try:
+        yield
+    finally:
+        builtins.__import__ = original_import
+
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
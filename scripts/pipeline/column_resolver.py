@@ -0,0 +1,193 @@
+"""
+Match workbook headers to the canonical column names automatically.
+
+Headers like "Coal intensity - (kg coal / ton cement)" or the flattened
+"name_unit" form are split into normalized tokens (lowercase, plurals and
+common typos fixed) and matched against the token rules in FIELDS. Each
+canonical field goes to the best-scoring header, and each header is used
+at most once.
+
+Two files make this repeatable:
+    data/column_aliases.json             hand-made fixes: {"normalized header": "canonical"}
+                                         (checked before the token rules)
+    outputs/cache/column_mappings.json   resolved mappings per header layout,
+                                         so known layouts skip matching
+
+Usage:
+    mapping, unresolved = resolve_columns(df.columns)
+    df = df.rename(columns=mapping)
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+ALIASES_PATH = Path(__file__).parent.parent.parent / "data" / "column_aliases.json"
+MAPPING_CACHE_PATH = Path(__file__).parent.parent.parent / "outputs" / "cache" / "column_mappings.json"
+
+# Bump this when the matching code changes so cached mappings are redone
+# (edits to SYNONYMS and FIELDS are noticed without it)
+RESOLVER_VERSION = 1
+
+# Token rewrites: plurals, spelling variants and typos seen in plant workbooks
+SYNONYMS = {
+    "years": "year", "fy": "year",
+    "tons": "t", "ton": "t", "tonnes": "t", "tonne": "t",
+    "exports": "export", "exp": "export",
+    "dispatches": "dispatch", "dispatched": "dispatch",
+    "distances": "distance", "dist": "distance",
+    "capcity": "capacity", "cap": "capacity",
+    "oxidized": "oxid", "oxidised": "oxid", "oxidation": "oxid",
+    "overload": "over", "overloaded": "over",
+    "allowable": "allowed",
+    "factor": "ef", "emission": "emissions",
+    "elec": "electricity",
+    "n": "north", "s": "south",
+}
+
+# For each canonical field: alternative token sets (all tokens of one set must
+# appear), tokens that rule a header out, and unit hints that add confidence.
+FIELDS = {
+    "year": {"match": [("year",)], "exclude": (), "units": ()},
+    "cement_t": {"match": [("cement", "production")], "exclude": ("intensity",), "units": ("t",)},
+    "local_t": {"match": [("local", "dispatch"), ("local", "sales")], "exclude": ("distance", "km"), "units": ("t",)},
+    "exp_n_t": {"match": [("export", "north")], "exclude": ("distance", "km", "transport"), "units": ("t",)},
+    "exp_s_t": {"match": [("export", "south")], "exclude": ("distance", "km", "transport"), "units": ("t",)},
+    "coal_int_kgpt": {"match": [("coal", "intensity")], "exclude": (), "units": ("kg",)},
+    "elec_int_kwhpt": {"match": [("electricity", "intensity")], "exclude": ("grid",), "units": ("kwh",)},
+    "clinker_ratio": {"match": [("clinker", "ratio")], "exclude": (), "units": ()},
+    "ncv": {"match": [("ncv",), ("calorific",)], "exclude": (), "units": ("gj", "tj")},
+    "co2_ef_tco2_per_tj": {"match": [("combustion", "ef"), ("combustion", "emissions")], "exclude": ("truck",), "units": ("tj",)},
+    "oxid_frac": {"match": [("oxid",)], "exclude": (), "units": ()},
+    "calc_ef": {"match": [("calcination",)], "exclude": (), "units": ("clinker",)},
+    "grid_ef_kg_per_kwh": {"match": [("grid", "ef"), ("grid", "emissions")], "exclude": (), "units": ("kwh",)},
+    "cap_allowed_t": {"match": [("truck", "capacity", "allowed")], "exclude": (), "units": ("t",)},
+    "cap_over_t": {"match": [("truck", "capacity", "over")], "exclude": (), "units": ("t",)},
+    "ef_allowed_gpkm": {"match": [("truck", "ef", "allowed")], "exclude": ("capacity",), "units": ("g", "km")},
+    "ef_over_gpkm": {"match": [("truck", "ef", "over")], "exclude": ("capacity",), "units": ("g", "km")},
+    "dist_local_km": {"match": [("local", "distance")], "exclude": (), "units": ("km",)},
+    "dist_exp_n_km": {"match": [("north", "distance")], "exclude": (), "units": ("km",)},
+    "dist_exp_s_km": {"match": [("south", "distance")], "exclude": (), "units": ("km",)},
+}
+
+
+def tokenize(header):
+    """Split a header into normalized tokens, e.g. 'Exports (North)-Tons' -> ['export', 'north', 't']."""
+    words = re.findall(r"[a-z0-9]+", str(header).lower().replace("_", " "))
+    return [SYNONYMS.get(word, word) for word in words]
+
+
+def normalize(header):
+    """Normalized form of a header, used as the key in the alias table."""
+    return " ".join(tokenize(header))
+
+
+def score(field, tokens):
+    """How well a header's tokens fit a canonical field (0 = no match)."""
+    rule = FIELDS[field]
+    token_set = set(tokens)
+    if token_set & set(rule["exclude"]):
+        return 0
+
+    matched = [alt for alt in rule["match"] if set(alt) <= token_set]
+    if not matched:
+        return 0
+
+    best = max(len(alt) for alt in matched)
+    unit_bonus = len(token_set & set(rule["units"]))
+    # Prefer headers without lots of unrelated words
+    return best * 10 + unit_bonus * 2 - len(token_set)
+
+
+def load_aliases(path=ALIASES_PATH):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_alias(header, canonical, path=ALIASES_PATH):
+    """Record that `header` means `canonical` for all future workbooks."""
+    if canonical not in FIELDS:
+        raise ValueError(f"Unknown canonical column '{canonical}'")
+    aliases = load_aliases(path)
+    aliases[normalize(header)] = canonical
+    Path(path).write_text(json.dumps(aliases, indent=2, sort_keys=True))
+
+
+def schema_hash(columns, aliases):
+    """Identify a header layout (plus alias table, matching rules and resolver version)."""
+    payload = json.dumps([RESOLVER_VERSION, [str(c) for c in columns], aliases, SYNONYMS, FIELDS],
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def match_columns(columns, aliases):
+    """Return {header: canonical} for the headers that could be matched."""
+    mapping = {}
+    taken = set()
+
+    # 1. Alias table
+    for col in columns:
+        canonical = aliases.get(normalize(col))
+        if canonical and canonical not in taken:
+            mapping[col] = canonical
+            taken.add(canonical)
+
+    # 2. Token rules, best (field, header) pairs first
+    candidates = []
+    for col in columns:
+        if col in mapping:
+            continue
+        tokens = tokenize(col)
+        for field in FIELDS:
+            if field not in taken:
+                s = score(field, tokens)
+                if s > 0:
+                    candidates.append((s, col, field))
+
+    for _, col, field in sorted(candidates, key=lambda c: -c[0]):
+        if col not in mapping and field not in taken:
+            mapping[col] = field
+            taken.add(field)
+
+    return mapping
+
+
+def resolve_columns(columns, use_cache=True):
+    """
+    Map raw headers to canonical names.
+
+    Returns (mapping, unresolved): mapping is {raw header: canonical name}
+    (headers already using a canonical name are left out), unresolved is the
+    list of canonical fields no header matched.
+    """
+    columns = list(columns)
+    aliases = load_aliases()
+    key = schema_hash(columns, aliases)
+
+    cache = {}
+    if use_cache and MAPPING_CACHE_PATH.exists():
+        try:
+            cache = json.loads(MAPPING_CACHE_PATH.read_text())
+        except json.JSONDecodeError:
+            cache = {}
+
+    if key in cache:
+        mapping = cache[key]
+    else:
+        mapping = match_columns(columns, aliases)
+        if use_cache:
+            cache[key] = mapping
+            MAPPING_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            # Parallel ingestion workers may write at the same time: replace the file atomically
+            tmp_path = MAPPING_CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(cache, indent=2))
+            tmp_path.replace(MAPPING_CACHE_PATH)
+
+    mapping = {raw: canonical for raw, canonical in mapping.items() if raw != canonical}
+    found = set(mapping.values()) | (set(columns) & set(FIELDS))
+    unresolved = [field for field in FIELDS if field not in found]
+    return mapping, unresolved
@@ -0,0 +1,109 @@
+"""
+Shrink DataFrame dtypes to the smallest safe type.
+
+After reading Excel/CSV every number is float64/int64 and every label is a
+Python object. compact_dtypes() picks narrower types:
+
+    - int64 columns -> int32, if every value fits
+    - float64 columns -> float32, if no value changes by more than
+      `float_tolerance` (relative) when stored as float32
+    - text columns with few distinct values (plant, region, route)
+      -> category
+
+Float columns stay floats, even if every value is a whole number, and
+integers are not made smaller than int32: numpy integer arithmetic wraps
+around silently when a result does not fit (an int16 year * year gives a
+wrong number, no error). Columns named in `small_ints` (e.g. ["year"],
+a stage's COMPACT_SMALL_INTS) may go down to int8/int16; only list columns
+no stage does arithmetic on beyond their range.
+
+The chosen dtypes are returned as a small dict ({column: dtype}). The
+saved table's schema file records them (see pipeline/schema.py), so later
+stages read compact frames directly, from CSV too.
+
+Turn it on per run with PIPELINE_COMPACT=1 (or a tolerance, e.g. 1e-5),
+or run_pipeline.py --compact.
+"""
+
+import os
+
+from pipeline.bootstrap import np, pd
+
+COMPACT_ENV_VAR = "PIPELINE_COMPACT"
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+# Integers are not narrowed below this, unless listed in small_ints
+MIN_INT_DTYPE = "int32"
+
+# A text column becomes a category if at most this share of its values are distinct
+MAX_CATEGORY_RATIO = 0.5
+
+
+def compact_tolerance():
+    """Float tolerance from $PIPELINE_COMPACT, or None if compaction is off."""
+    value = os.environ.get(COMPACT_ENV_VAR, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    if value in ("1", "true", "yes", "on"):
+        return DEFAULT_FLOAT_TOLERANCE
+    return float(value)
+
+
+def _compact_float(values, float_tolerance):
+    """Return the narrower dtype for a float column, or None to keep it."""
+    finite = values[np.isfinite(values)]
+    as_float32 = finite.astype(np.float32)
+    if np.isinf(as_float32).any():
+        return None
+    with np.errstate(divide="ignore", invalid="ignore"):
+        error = np.abs(as_float32.astype(np.float64) - finite) / np.abs(finite)
+    error = error[np.isfinite(error)]
+    if error.size == 0 or error.max() <= float_tolerance:
+        return "float32"
+    return None
+
+
+def _smallest_int(values, smallest="int8"):
+    """The smallest integer dtype from `smallest` upwards that holds all `values`."""
+    sizes = ("int8", "int16", "int32", "int64")
+    sizes = sizes[sizes.index(smallest):]
+    if values.size == 0:
+        return sizes[0]
+    low, high = values.min(), values.max()
+    for dtype in sizes:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def compact_dtypes(df, float_tolerance=DEFAULT_FLOAT_TOLERANCE, max_category_ratio=MAX_CATEGORY_RATIO,
+                   small_ints=()):
+    """
+    Return (compact_df, schema) where schema is {column: new dtype} for the changed columns.
+
+    Columns that cannot be narrowed safely are left as they are. Integer
+    columns in `small_ints` may become int8/int16, the others stay >= int32.
+    """
+    small_ints = set(small_ints)
+    schema = {}
+    for name in df.columns:
+        col = df[name]
+        new_dtype = None
+
+        if pd.api.types.is_bool_dtype(col) or isinstance(col.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(col):
+            smallest = "int8" if name in small_ints else MIN_INT_DTYPE
+            new_dtype = _smallest_int(col.to_numpy(), smallest)
+        elif pd.api.types.is_float_dtype(col):
+            new_dtype = _compact_float(col.to_numpy(dtype=np.float64), float_tolerance)
+        elif pd.api.types.is_object_dtype(col) or pd.api.types.is_string_dtype(col):
+            if len(col) and col.nunique(dropna=True) <= max_category_ratio * len(col):
+                new_dtype = "category"
+
+        if new_dtype is not None and new_dtype != str(col.dtype):
+            schema[name] = new_dtype
+
+    return (df.astype(schema) if schema else df), schema
+
@@ -0,0 +1,134 @@
+"""
+Scope 1/2/3 emissions for cement production, computed on whole columns.
+
+Every function works on NumPy arrays (or DataFrame columns) of any shape
+that broadcast together, so one call covers every year and plant at once.
+All results are in tonnes of CO2.
+
+Formulas (per row):
+    Scope 1 combustion  = cement_t * coal_int_kgpt / 1000         (t coal)
+                          * ncv / 1000                            (TJ, ncv in GJ/t)
+                          * co2_ef_tco2_per_tj * oxid_frac
+    Scope 1 calcination = cement_t * calc_ef
+                          (* clinker_ratio if calc_ef is per ton clinker)
+    Scope 2 grid        = cement_t * elec_int_kwhpt * grid_ef_kg_per_kwh / 1000
+    Scope 3 trucking    = for each route (local, exports north, exports south):
+                          tonnes * distance * (
+                              allowed_frac  / cap_allowed_t * ef_allowed_gpkm
+                            + overload_frac / cap_over_t    * ef_over_gpkm
+                          ) / 1e6
+
+Usage:
+    scopes_df = compute_scopes(df, calc_ef_is_per_clinker=True, overload_frac=0.6, allowed_frac=0.4)
+"""
+
+from pipeline.bootstrap import np
+
+REQUIRED_COLUMNS = [
+    "cement_t", "local_t", "exp_n_t", "exp_s_t",
+    "coal_int_kgpt", "ncv", "co2_ef_tco2_per_tj", "oxid_frac",
+    "calc_ef", "clinker_ratio",
+    "elec_int_kwhpt", "grid_ef_kg_per_kwh",
+    "cap_allowed_t", "cap_over_t", "ef_allowed_gpkm", "ef_over_gpkm",
+    "dist_local_km", "dist_exp_n_km", "dist_exp_s_km",
+]
+
+# (tonnes column, distance column) for each trucking route
+TRUCK_ROUTES = {
+    "local": ("local_t", "dist_local_km"),
+    "exp_n": ("exp_n_t", "dist_exp_n_km"),
+    "exp_s": ("exp_s_t", "dist_exp_s_km"),
+}
+
+SCOPE_COLUMNS = [
+    "scope1_combustion_t", "scope1_calcination_t", "scope1_t",
+    "scope2_t",
+    "scope3_local_t", "scope3_exp_n_t", "scope3_exp_s_t", "scope3_t",
+    "total_t",
+]
+
+
+def combustion_emissions(cement_t, coal_int_kgpt, ncv, co2_ef_tco2_per_tj, oxid_frac):
+    """Scope 1 CO2 from burning coal in the kiln."""
+    coal_t = cement_t * coal_int_kgpt / 1000.0
+    energy_tj = coal_t * ncv / 1000.0
+    return energy_tj * co2_ef_tco2_per_tj * oxid_frac
+
+
+def calcination_emissions(cement_t, calc_ef, clinker_ratio, calc_ef_is_per_clinker=True):
+    """Scope 1 CO2 released from limestone when clinker is made."""
+    if calc_ef_is_per_clinker:
+        return cement_t * clinker_ratio * calc_ef
+    return cement_t * calc_ef
+
+
+def grid_emissions(cement_t, elec_int_kwhpt, grid_ef_kg_per_kwh):
+    """Scope 2 CO2 from grid electricity."""
+    return cement_t * elec_int_kwhpt * grid_ef_kg_per_kwh / 1000.0
+
+
+def truck_emission_factor(cap_allowed_t, cap_over_t, ef_allowed_gpkm, ef_over_gpkm,
+                          overload_frac=0.60, allowed_frac=0.40):
+    """Weighted grams CO2 per tonne-km for the allowed/overloaded truck split."""
+    return (allowed_frac * ef_allowed_gpkm / cap_allowed_t
+            + overload_frac * ef_over_gpkm / cap_over_t)
+
+
+def trucking_emissions(tonnes, distance_km, g_per_tkm):
+    """Scope 3 CO2 for moving `tonnes` over `distance_km` by truck."""
+    return tonnes * distance_km * g_per_tkm / 1e6
+
+
+def missing_columns(df):
+    """Return the REQUIRED_COLUMNS that `df` does not have."""
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+
+def scope_arrays(col, calc_ef_is_per_clinker=True, overload_frac=0.60, allowed_frac=0.40):
+    """
+    Compute every SCOPE_COLUMNS array from a dict of input arrays.
+
+    `col` maps each name in REQUIRED_COLUMNS to an array. The arrays and the
+    three settings may have any shapes that broadcast together, e.g. inputs
+    of shape (1, years) with settings of shape (scenarios, 1).
+    """
+    out = {}
+    out["scope1_combustion_t"] = combustion_emissions(
+        col["cement_t"], col["coal_int_kgpt"], col["ncv"], col["co2_ef_tco2_per_tj"], col["oxid_frac"])
+
+    # The flag may be an array (one value per scenario), so use where() instead of if
+    clinker_basis = np.where(calc_ef_is_per_clinker, col["clinker_ratio"], 1.0)
+    out["scope1_calcination_t"] = calcination_emissions(
+        col["cement_t"], col["calc_ef"], clinker_basis, calc_ef_is_per_clinker=True)
+    out["scope1_t"] = out["scope1_combustion_t"] + out["scope1_calcination_t"]
+
+    out["scope2_t"] = grid_emissions(col["cement_t"], col["elec_int_kwhpt"], col["grid_ef_kg_per_kwh"])
+
+    g_per_tkm = truck_emission_factor(
+        col["cap_allowed_t"], col["cap_over_t"], col["ef_allowed_gpkm"], col["ef_over_gpkm"],
+        overload_frac, allowed_frac)
+    out["scope3_t"] = 0.0
+    for route, (tonnes_col, dist_col) in TRUCK_ROUTES.items():
+        route_t = trucking_emissions(col[tonnes_col], col[dist_col], g_per_tkm)
+        out[f"scope3_{route}_t"] = route_t
+        out["scope3_t"] = out["scope3_t"] + route_t
+
+    out["total_t"] = out["scope1_t"] + out["scope2_t"] + out["scope3_t"]
+    return out
+
+
+def compute_scopes(df, calc_ef_is_per_clinker=True, overload_frac=0.60, allowed_frac=0.40):
+    """
+    Return `df` with the SCOPE_COLUMNS added (a new frame; the other columns are shared, not copied).
+
+    `df` must use the canonical column names in REQUIRED_COLUMNS.
+    """
+    missing = missing_columns(df)
+    if missing:
+        raise KeyError(f"Missing columns for emissions calculation: {missing}")
+
+    col = {name: df[name].to_numpy(dtype=np.float64) for name in REQUIRED_COLUMNS}
+    out = scope_arrays(col, calc_ef_is_per_clinker, overload_frac, allowed_frac)
+    result = df.assign(**{name: out[name] for name in SCOPE_COLUMNS})
+    result.attrs["units"] = {**result.attrs.get("units", {}), **{name: "tCO2" for name in SCOPE_COLUMNS}}
+    return result
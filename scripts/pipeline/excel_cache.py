@@ -0,0 +1,122 @@
+"""
+Content-hashed cache for parsed Excel sheets.
+
+Parsing Excel XML is slow. After the first run, the parsed and flattened
+DataFrame is saved as an Arrow file in outputs/cache/. Later runs read it
+back memory-mapped instead of parsing the workbook again.
+
+The cache file name contains a hash of the workbook's bytes, a hash of
+its location, the sheet and the header strategy, so editing the workbook
+automatically invalidates it. The code that parses the sheet
+(excel_loader.py and this file) is part of the hash too, so a change to
+the parsing also makes every sheet be parsed again.
+
+Usage:
+    cache_file = cache_path(INPUT_PATH, sheet_name=None, header_strategy="auto")
+    cached = read_cached_frame(cache_file)
+    if cached is None:
+        df, header_info = ...  # parse the workbook
+        write_cached_frame(cache_file, df, header_info)
+"""
+
+import glob
+import hashlib
+import json
+from pathlib import Path
+
+from pipeline.arrow_files import arrow_table, open_arrow, table_to_frame, write_arrow
+
+CACHE_DIR = Path(__file__).parent.parent.parent / "outputs" / "cache"
+
+# Bump this when the way cached frames are stored changes so old cache files are ignored
+# (changes to the parsing code are noticed without it, see parser_hash())
+CACHE_VERSION = 2
+
+# The modules whose code decides what a parsed sheet looks like
+PARSER_FILES = ("excel_loader.py", "excel_cache.py")
+
+_METADATA_KEY = b"pipeline.header_info"
+
+
+def file_hash(path, block_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parser_hash():
+    """Hash of the parsing code in PARSER_FILES; when it changes, cached sheets are parsed again."""
+    digest = hashlib.sha256()
+    for name in PARSER_FILES:
+        digest.update(name.encode())
+        digest.update((Path(__file__).parent / name).read_bytes())
+    return digest.hexdigest()
+
+
+def _entry_prefix(workbook_path, sheet_name, header_strategy):
+    sheet = "first" if sheet_name is None else str(sheet_name)
+    # Workbooks with the same name in different folders must not share (and delete) entries
+    location = hashlib.sha256(str(Path(workbook_path).resolve()).encode()).hexdigest()[:8]
+    return f"{Path(workbook_path).stem}-{location}-{sheet}-{header_strategy}-v{CACHE_VERSION}-"
+
+
+def cache_path(workbook_path, sheet_name=None, header_strategy="auto", cache_dir=CACHE_DIR):
+    """Return the cache file for this workbook content, sheet, header strategy and parsing code."""
+    prefix = _entry_prefix(workbook_path, sheet_name, header_strategy)
+    # Content and parser in the last part, so an entry made by older code is replaced as stale
+    version = hashlib.sha256((file_hash(workbook_path) + parser_hash()).encode()).hexdigest()
+    return Path(cache_dir) / f"{prefix}{version[:16]}.arrow"
+
+
+def read_cached_frame(path):
+    """
+    Load a cached frame, or return None if there is no usable cache file.
+
+    Returns (df, header_info), where header_info is the dict that was saved
+    with the frame (sheet name, header strategy, header pairs, ...).
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    try:
+        table = open_arrow(path)
+    except (pa.ArrowInvalid, OSError):
+        # Half-written or corrupt file: ignore it, it will be rewritten
+        return None
+
+    metadata = table.schema.metadata or {}
+    header_info = json.loads(metadata.get(_METADATA_KEY, b"{}"))
+    return table_to_frame(table), header_info
+
+
+def write_cached_frame(path, df, header_info):
+    """
+    Save a parsed frame to the cache and remove stale entries for the same sheet.
+
+    Does nothing (returns None) if pyarrow is not installed.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_arrow(arrow_table(df, {_METADATA_KEY: json.dumps(header_info).encode()}), path)
+
+    # Older entries for the same workbook/sheet/strategy are now stale
+    prefix = path.name.rsplit("-", 1)[0] + "-"
+    for old in path.parent.glob(glob.escape(prefix) + "*.arrow"):
+        if old != path:
+            old.unlink()
+
+    return path
@@ -0,0 +1,233 @@
+"""
+Single-pass Excel loader.
+
+Opening a workbook with pandas re-reads the whole zip/XML file every time.
+This module parses each sheet ONCE into a raw grid (every cell, no header
+handling) and then does the preview, the header check and the final
+DataFrame build by slicing that grid in memory.
+
+Usage:
+    wb = Workbook(INPUT_PATH)
+    grid = wb.grid(wb.sheet_names[0])
+    df = build_frame(grid, dual_header=probe_dual_header(grid))
+
+For sheets too large to hold as a grid, iter_sheet_chunks() streams the
+rows instead and yields DataFrames of at most `chunk_rows` rows:
+    for chunk in iter_sheet_chunks(INPUT_PATH, chunk_rows=100_000):
+        ...
+"""
+
+import itertools
+import numbers
+
+from pipeline.bootstrap import np, pd
+from pipeline.instrument import count_read
+
+
+class Workbook:
+    """An opened Excel file whose sheets are parsed lazily, at most once each."""
+
+    def __init__(self, path):
+        self.path = path
+        self._excel_file = pd.ExcelFile(path)
+        count_read(path)
+        self.sheet_names = self._excel_file.sheet_names
+        self._grids = {}
+
+    def grid(self, sheet_name):
+        """Return the raw cell grid of a sheet (header=None), parsing it on first use."""
+        if sheet_name not in self._grids:
+            self._grids[sheet_name] = self._excel_file.parse(sheet_name, header=None)
+        return self._grids[sheet_name]
+
+
+def preview(grid, nrows=5):
+    """Same result as `pd.read_excel(..., nrows=nrows)` but taken from the grid."""
+    return build_frame(grid.iloc[:nrows + 1], dual_header=False)
+
+
+def probe_dual_header(grid):
+    """
+    Check whether the sheet has a second header row holding units.
+
+    The second row counts as a unit row when it has at least one text cell
+    and no numeric cells. A row of numbers is data, not units.
+    """
+    if len(grid) < 2:
+        return False
+    return looks_like_units(grid.iloc[1])
+
+
+def looks_like_units(row):
+    """True if a row of cell values has some text and no numbers (see probe_dual_header)."""
+    values = [value for value in row if not pd.isna(value)]
+    has_text = any(isinstance(value, str) and value.strip() for value in values)
+    has_numbers = any(
+        isinstance(value, numbers.Number) and not isinstance(value, bool)
+        for value in values
+    )
+    return has_text and not has_numbers
+
+
+def header_pairs(grid, dual_header):
+    """
+    Return the header as a list of (name, unit) tuples.
+
+    Blank names are filled from the cell to the left (merged header cells)
+    and blank units become ''. With a single header every unit is ''.
+    """
+    return row_header_pairs(grid.iloc[0], grid.iloc[1] if dual_header else None)
+
+
+def row_header_pairs(name_row, unit_row=None):
+    """Same as header_pairs(), from the header row values (unit_row=None: single header)."""
+    dual_header = unit_row is not None
+    names = []
+    last_name = ""
+    for i, value in enumerate(name_row):
+        if pd.isna(value) or str(value).strip() == "":
+            name = last_name if dual_header and last_name else f"Unnamed: {i}"
+        else:
+            name = value if isinstance(value, str) else str(value)
+        names.append(name)
+        last_name = name
+
+    if not dual_header:
+        return [(name, "") for name in names]
+
+    units = ["" if pd.isna(value) else str(value).strip() for value in unit_row]
+    units += [""] * (len(names) - len(units))
+    return list(zip(names, units))
+
+
+def flatten_columns(pairs):
+    """Combine (name, unit) header pairs into 'name_unit' column names."""
+    return [f"{name}_{unit}".strip() if unit else name for name, unit in pairs]
+
+
+def column_units(pairs):
+    """Return {column name: unit} for the header pairs that have a unit (see flatten_columns)."""
+    return {column: unit for column, (_, unit) in zip(flatten_columns(pairs), pairs) if unit}
+
+
+def build_frame(grid, dual_header):
+    """
+    Build the final DataFrame from a raw grid.
+
+    With dual_header=True the two header rows are flattened to 'name_unit'
+    and the units are kept in df.attrs["units"] (see pipeline/schema.py).
+    Column dtypes are inferred from the data rows only, like read_excel does.
+    """
+    header_rows = 2 if dual_header else 1
+    pairs = header_pairs(grid, dual_header)
+
+    df = grid.iloc[header_rows:].reset_index(drop=True).infer_objects()
+    df.columns = flatten_columns(pairs) if dual_header else [name for name, _ in pairs]
+    if dual_header:
+        df.attrs["units"] = column_units(pairs)
+    return df
+
+
+class _ColumnBuffer:
+    """Fixed-size buffer for one column: float64 until a non-number shows up, then object."""
+
+    def __init__(self, size, numeric=True):
+        self.numeric = numeric
+        self.values = np.full(size, np.nan) if numeric else np.empty(size, dtype=object)
+
+    def set(self, i, value):
+        if self.numeric:
+            if value is None:
+                return
+            if isinstance(value, numbers.Number) and not isinstance(value, bool):
+                self.values[i] = value
+                return
+            # Text (or a date) in a numeric column: keep everything as objects from now on
+            self.values = self.values.astype(object)
+            self.values[np.isnan(self.values.astype(float))] = None
+            self.numeric = False
+        self.values[i] = value
+
+
+def iter_sheet_chunks(path, sheet_name=None, chunk_rows=100_000, header_strategy="auto", dtypes=None):
+    """
+    Stream a sheet row by row and yield DataFrames of up to `chunk_rows` rows.
+
+    Uses openpyxl's read-only mode, so only one chunk of values is held in
+    memory at a time. Headers are handled like build_frame() (2-row headers
+    are flattened to 'name_unit'). Numeric columns come back as float64,
+    because a chunk cannot know whether later rows have decimals; pass
+    `dtypes` (e.g. {"year": "int64", "notes": "str"}) to convert columns in
+    every chunk. A numeric column that meets text turns into an object
+    column from that chunk on, which open_frame_writer() refuses (the
+    earlier chunks were saved as numbers): give such columns "str".
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    count_read(path)
+    try:
+        sheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+
+        name_row = next(rows, None)
+        if name_row is None:
+            return
+        second_row = next(rows, None)
+
+        if header_strategy == "auto":
+            dual_header = second_row is not None and looks_like_units(second_row)
+        else:
+            dual_header = header_strategy == "dual"
+
+        pairs = row_header_pairs(name_row, second_row if dual_header else None)
+        columns = flatten_columns(pairs) if dual_header else [name for name, _ in pairs]
+        units = column_units(pairs)
+        width = len(columns)
+
+        # With a single header the second row we peeked at is already data
+        pending = [] if dual_header or second_row is None else [second_row]
+        numeric = [True] * width
+
+        buffers = [_ColumnBuffer(chunk_rows, numeric[j]) for j in range(width)]
+        n = 0
+        any_chunk = False
+        for row in itertools.chain(pending, rows):
+            if all(value is None for value in row):
+                continue
+            for j, value in enumerate(row[:width]):
+                buffers[j].set(n, value)
+            n += 1
+
+            if n == chunk_rows:
+                yield _chunk_frame(buffers, columns, n, dtypes, units)
+                any_chunk = True
+                numeric = [buffer.numeric for buffer in buffers]
+                buffers = [_ColumnBuffer(chunk_rows, numeric[j]) for j in range(width)]
+                n = 0
+
+        if n or not any_chunk:
+            # A header without data rows still gives one (empty) chunk, so the columns are known
+            yield _chunk_frame(buffers, columns, n, dtypes, units)
+    finally:
+        workbook.close()
+
+
+def _chunk_frame(buffers, columns, n, dtypes, units):
+    data = {}
+    for name, buffer in zip(columns, buffers):
+        values = buffer.values[:n]
+        data[name] = values if buffer.numeric else pd.Series(values).infer_objects()
+    df = pd.DataFrame(data, columns=columns)
+    for name, dtype in (dtypes or {}).items():
+        if name not in df.columns:
+            continue
+        col = df[name]
+        if dtype in ("str", "object", "string"):
+            # Missing values stay missing instead of becoming the text "nan"
+            df[name] = col.where(col.isna(), col.astype(str)).astype(object)
+        else:
+            df[name] = col.astype(dtype)
+    if units:
+        df.attrs["units"] = units
+    return df
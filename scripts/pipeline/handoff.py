@@ -0,0 +1,64 @@
+"""
+Zero-copy hand-off of tables between worker processes.
+
+When the runner runs stages in a process pool, sending a DataFrame to a
+worker normally pickles (copies) the whole table, and every process ends up
+with its own copy. Instead, a finished table is written once as an
+uncompressed Arrow IPC file in shared memory (/dev/shm when available,
+otherwise outputs/.handoff/) and later stages open it memory-mapped.
+
+The pandas columns of such a view point straight into the mapped file, so
+numeric columns without missing values are not copied, and a stage only
+pages in the columns it actually uses. The arrays are read-only: adding or
+replacing columns is fine, but in-place edits need copy-on-write pandas.
+
+Usage:
+    with HandoffDir() as handoff:
+        path = handoff.publish(df, "01_first_analysis")
+        view = open_view(path)
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from pipeline.arrow_files import arrow_table, open_arrow, table_to_frame, write_arrow
+
+SHARED_MEMORY_DIR = Path("/dev/shm")
+FALLBACK_DIR = Path(__file__).parent.parent.parent / "outputs" / ".handoff"
+
+
+def publish(df, path):
+    """Write `df` as an uncompressed Arrow IPC file and return its path."""
+    return write_arrow(arrow_table(df), path)
+
+
+def open_view(path, columns=None):
+    """Open a published table memory-mapped and return it as a read-only DataFrame."""
+    table = open_arrow(path)
+    if columns is not None:
+        table = table.select(list(columns))
+    return table_to_frame(table)
+
+
+class HandoffDir:
+    """A temporary directory for published tables, removed again on exit."""
+
+    def __init__(self, base_dir=None):
+        if base_dir is None:
+            shared = SHARED_MEMORY_DIR.is_dir() and os.access(SHARED_MEMORY_DIR, os.W_OK)
+            base_dir = SHARED_MEMORY_DIR if shared else FALLBACK_DIR
+        self.base_dir = Path(base_dir)
+        self.path = None
+
+    def publish(self, df, name):
+        return publish(df, self.path / f"{name}.arrow")
+
+    def __enter__(self):
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix="pipeline-", dir=self.base_dir))
+        return self
+
+    def __exit__(self, *exc_info):
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,129 @@
+"""
+Read many plant workbooks (and all their sheets) into one table.
+
+Parsing Excel XML is CPU-bound, so the sheets are parsed in parallel in a
+pool of worker processes. Each sheet is parsed once (and reused from the
+outputs/cache/ Arrow cache when the workbook has not changed), its headers
+are matched to the canonical names, and every row is tagged with `plant`
+and `sheet` before everything is concatenated.
+
+Workbooks can be given as:
+    - a glob pattern:   "data/plants/*.xlsx"
+    - a manifest CSV:   columns `path` and optionally `plant` and `sheets`
+                        (sheet names separated by ';', empty = all sheets)
+    - a list of paths
+
+Usage:
+    table, failures = ingest_workbooks("data/plants/*.xlsx", workers=8)
+"""
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pipeline.bootstrap import pd
+from pipeline.column_resolver import resolve_columns
+from pipeline.excel_cache import cache_path, read_cached_frame, write_cached_frame
+from pipeline.excel_loader import Workbook, build_frame, header_pairs, probe_dual_header
+
+
+def workbook_list(source):
+    """
+    Return [(path, plant, sheets or None)] for a glob, manifest CSV or list of paths.
+
+    The plant name defaults to the workbook file name without its extension.
+    """
+    if isinstance(source, (list, tuple)):
+        return [(Path(path), Path(path).stem, None) for path in source]
+
+    source = str(source)
+    if source.lower().endswith(".csv"):
+        manifest = pd.read_csv(source, dtype=str).fillna("")
+        base_dir = Path(source).parent
+        entries = []
+        for row in manifest.itertuples(index=False):
+            path = Path(row.path)
+            if not path.is_absolute():
+                path = base_dir / path
+            plant = getattr(row, "plant", "") or path.stem
+            sheets = [s for s in getattr(row, "sheets", "").split(";") if s] or None
+            entries.append((path, plant, sheets))
+        return entries
+
+    return [(Path(path), Path(path).stem, None) for path in sorted(glob.glob(source))]
+
+
+def _list_task(path):
+    try:
+        return Workbook(path).sheet_names, None
+    except Exception as error:  # a workbook that cannot be opened is reported like a bad sheet
+        return [], f"{path}: {error}"
+
+
+def _parse_sheet(path, plant, sheet_name, header_strategy, use_cache):
+    """Parse one sheet into a canonical-named DataFrame tagged with plant and sheet."""
+    cache_file = cache_path(path, sheet_name, header_strategy) if use_cache else None
+    cached = read_cached_frame(cache_file) if cache_file else None
+    if cached is not None:
+        df, _ = cached
+    else:
+        grid = Workbook(path).grid(sheet_name)
+        if header_strategy == "auto":
+            dual_header = probe_dual_header(grid)
+        else:
+            dual_header = header_strategy == "dual"
+        df = build_frame(grid, dual_header=dual_header)
+        if cache_file:
+            header_info = {
+                "sheet_name": sheet_name,
+                "dual_header": dual_header,
+                "header_pairs": header_pairs(grid, dual_header=dual_header),
+            }
+            write_cached_frame(cache_file, df, header_info)
+
+    mapping, _ = resolve_columns(df.columns)
+    df = df.rename(columns=mapping)
+    df.insert(0, "sheet", sheet_name)
+    df.insert(0, "plant", plant)
+    return df
+
+
+def _parse_task(task):
+    path, plant, sheet_name, header_strategy, use_cache = task
+    try:
+        return _parse_sheet(path, plant, sheet_name, header_strategy, use_cache), None
+    except Exception as error:  # keep going; one bad sheet should not stop a batch of hundreds
+        return None, f"{path} [{sheet_name}]: {error}"
+
+
+def ingest_workbooks(source, workers=None, header_strategy="auto", use_cache=True):
+    """
+    Parse every selected sheet of every workbook and concatenate the results.
+
+    Returns (table, failures): `table` has `plant` and `sheet` columns plus
+    the (canonical) data columns; `failures` lists the workbooks and
+    sheets that could not be read, with the error.
+    """
+    entries = workbook_list(source)
+    if not entries:
+        raise FileNotFoundError(f"No workbooks found for {source}")
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Listing sheets opens each workbook, so do that in parallel too
+        unlisted = [path for path, _, sheets in entries if sheets is None]
+        listed = dict(zip(unlisted, pool.map(_list_task, unlisted)))
+
+        tasks = [
+            (path, plant, sheet_name, header_strategy, use_cache)
+            for path, plant, sheets in entries
+            for sheet_name in (sheets if sheets is not None else listed[path][0])
+        ]
+        results = list(pool.map(_parse_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    frames = [df for df, _ in results if df is not None]
+    failures = [error for _, error in listed.values() if error is not None]
+    failures += [error for _, error in results if error is not None]
+    table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["plant", "sheet"])
+    return table, failures
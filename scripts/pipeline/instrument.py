@@ -0,0 +1,187 @@
+"""
+Timing and memory measurements for each stage.
+
+Every stage has three phases, the STEP blocks of 00_TEMPLATE.py:
+    read      load the input table
+    process   turn it into the output table
+    save      write the output table
+
+For each phase StageMetrics records wall time, CPU time, peak memory
+(RSS) during the phase, rows in/out and the size of the files read and
+written by the pipeline's readers and writers. Per stage it also keeps the time spent
+importing modules (`import_seconds`, see pipeline/bootstrap.py):
+
+    metrics = StageMetrics("02_example_next_step")
+    with metrics.phase("read") as step:
+        df = read_frame(INPUT_CSV)
+        step["rows_out"] = len(df)
+    with metrics.phase("process", rows_in=len(df)) as step:
+        result = process(df)
+        step["rows_out"] = len(result)
+    print_summary([metrics.as_dict()])
+
+run_pipeline.py does this for every stage, prints the summary table and
+saves all numbers to outputs/run_report.json.
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+REPORT_PATH = Path(__file__).parent.parent.parent / "outputs" / "run_report.json"
+
+PHASES = ("read", "process", "save")
+
+# Size of the files read/written by stage_io, the Excel loader and the hand-off files, in this process.
+# A read counts the whole file, even when only some columns or row groups of a Parquet file are decoded.
+IO_COUNTERS = {"bytes_read": 0, "bytes_written": 0}
+
+
+def _file_size(path):
+    try:
+        return Path(path).stat().st_size
+    except OSError:
+        return 0
+
+
+def count_read(path):
+    """Add the size of a file that was read to IO_COUNTERS (the whole file, however little of it was decoded)."""
+    IO_COUNTERS["bytes_read"] += _file_size(path)
+
+
+def count_written(path):
+    """Add the size of a file that was written to IO_COUNTERS."""
+    IO_COUNTERS["bytes_written"] += _file_size(path)
+
+
+def _reset_peak_rss():
+    """Start a new peak-memory measurement (Linux only; elsewhere the peak is since process start)."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_bytes():
+    """Highest resident memory of this process since the last reset, or None where it cannot be measured (Windows)."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageMetrics:
+    """Collects the measurements of one stage's phases; a phase run several times (chunks) adds up."""
+
+    def __init__(self, name):
+        self.name = name
+        self.phases = {}
+        self.import_seconds = 0.0
+
+    @contextmanager
+    def phase(self, name, rows_in=None):
+        """Measure the code inside the `with` block; set step["rows_out"] inside it."""
+        step = {"rows_in": rows_in, "rows_out": None}
+        bytes_read = IO_COUNTERS["bytes_read"]
+        bytes_written = IO_COUNTERS["bytes_written"]
+        _reset_peak_rss()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield step
+        finally:
+            self._add(name, {
+                "wall_s": time.perf_counter() - wall_start,
+                "cpu_s": time.process_time() - cpu_start,
+                "peak_rss_bytes": _peak_rss_bytes(),
+                "rows_in": step["rows_in"],
+                "rows_out": step["rows_out"],
+                "bytes_read": IO_COUNTERS["bytes_read"] - bytes_read,
+                "bytes_written": IO_COUNTERS["bytes_written"] - bytes_written,
+            })
+
+    def _add(self, name, record):
+        if name not in self.phases:
+            self.phases[name] = record
+            return
+        total = self.phases[name]
+        for key, value in record.items():
+            if value is None:
+                continue
+            if total[key] is None:
+                total[key] = value
+            elif key == "peak_rss_bytes":
+                total[key] = max(total[key], value)
+            else:
+                total[key] = total[key] + value
+
+    def as_dict(self):
+        """All measurements as plain numbers (safe to send between processes or save as JSON)."""
+        phases = {name: dict(record) for name, record in self.phases.items()}
+        records = phases.values()
+        process = phases.get("process", {})
+        return {
+            "stage": self.name,
+            "phases": phases,
+            "wall_s": sum(record["wall_s"] for record in records),
+            "cpu_s": sum(record["cpu_s"] for record in records),
+            "import_s": self.import_seconds,
+            "peak_rss_bytes": max((record["peak_rss_bytes"] for record in records
+                                   if record["peak_rss_bytes"] is not None), default=None),
+            "rows_in": process.get("rows_in"),
+            "rows_out": process.get("rows_out"),
+            "bytes_read": sum(record["bytes_read"] for record in records),
+            "bytes_written": sum(record["bytes_written"] for record in records),
+        }
+
+
+def _megabytes(n_bytes):
+    return f"{n_bytes / 1e6:9.2f}" if n_bytes is not None else f"{'-':>9}"
+
+
+def _rows(n):
+    return f"{n:>10,}" if n is not None else f"{'-':>10}"
+
+
+def print_summary(stages, total_seconds=None):
+    """Print one line per stage and phase: times, peak memory, rows and MB of files read/written."""
+    print(f"  {'stage / phase':36s} {'wall s':>8} {'cpu s':>8} {'import s':>8} {'peak MB':>9} "
+          f"{'rows in':>10} {'rows out':>10} {'file MB r':>9} {'file MB w':>10}")
+    for stage in stages:
+        print(f"  {stage['stage']:36s} {stage['wall_s']:8.3f} {stage['cpu_s']:8.3f} {stage['import_s']:8.3f} "
+              f"{_megabytes(stage['peak_rss_bytes'])} {_rows(stage['rows_in'])} {_rows(stage['rows_out'])} "
+              f"{_megabytes(stage['bytes_read'])} {_megabytes(stage['bytes_written']):>10}")
+        for name in PHASES:
+            phase = stage["phases"].get(name)
+            if phase is None:
+                continue
+            print(f"    {name:34s} {phase['wall_s']:8.3f} {phase['cpu_s']:8.3f} {'':8s} "
+                  f"{_megabytes(phase['peak_rss_bytes'])} {_rows(phase['rows_in'])} {_rows(phase['rows_out'])} "
+                  f"{_megabytes(phase['bytes_read'])} {_megabytes(phase['bytes_written']):>10}")
+    if total_seconds is not None:
+        print(f"  {'TOTAL':36s} {total_seconds:8.3f}")
+
+
+def write_report(stages, path=REPORT_PATH, **run_info):
+    """Save the measurements of a run as JSON and return the path."""
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        **run_info,
+        "stages": list(stages),
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2))
+    return path
@@ -0,0 +1,92 @@
+"""
+Fingerprints and the run manifest used for incremental rebuilds.
+
+A stage's fingerprint is a hash of:
+    - its script's source code (and the shared pipeline/ helpers)
+    - its parameters: the UPPERCASE settings at the top of the script,
+      e.g. CALC_EF_IS_PER_CLINKER or OVERLOAD_FRAC
+    - its inputs: the fingerprint of the stage that produced each input in
+      this run, or the file contents for inputs made outside the run
+      (e.g. data/Paper_Data.xlsx)
+    - run settings that change its table, e.g. the --compact tolerance
+
+The manifest (outputs/.pipeline_manifest.json) remembers the fingerprint
+each stage had when it last ran. If it is unchanged and the stage's output
+still exists, the stage can be skipped.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from pipeline.excel_cache import file_hash
+
+MANIFEST_PATH = Path(__file__).parent.parent.parent / "outputs" / ".pipeline_manifest.json"
+PIPELINE_DIR = Path(__file__).parent
+
+
+def stage_params(module):
+    """Return the stage's UPPERCASE settings, excluding its INPUT_*/OUTPUT_* paths."""
+    params = {}
+    for name, value in vars(module).items():
+        if not name.isupper() or name.startswith(("INPUT_", "OUTPUT_")):
+            continue
+        try:
+            json.dumps(value)
+        except TypeError:
+            continue
+        params[name] = value
+    return params
+
+
+def library_hash():
+    """Hash of the shared pipeline/ helpers; changing them invalidates every stage."""
+    digest = hashlib.sha256()
+    for path in sorted(PIPELINE_DIR.glob("*.py")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def input_fingerprint(path):
+    """Content hash of an input file made outside this run, or '' if it is missing."""
+    path = Path(path)
+    if path.is_file():
+        return file_hash(path)
+
+    # Stage tables may be saved with a different suffix (see stage_io)
+    from pipeline.stage_io import find_frame
+
+    found = find_frame(path)
+    return file_hash(found) if found else ""
+
+
+def stage_fingerprint(source_path, module, input_fingerprints, library=None, settings=None):
+    """Combine source, parameters, input fingerprints and run `settings` ({name: value}) into one hex digest."""
+    payload = {
+        "source": file_hash(source_path),
+        "library": library if library is not None else library_hash(),
+        "params": stage_params(module),
+        "inputs": sorted(input_fingerprints),
+        "settings": settings or {},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Return {stage file name: fingerprint} from the last runs, or {} if none."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except json.JSONDecodeError:
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp_path.replace(path)
@@ -0,0 +1,154 @@
+"""
+Remembered stage results, so an unchanged stage is not run twice.
+
+With PIPELINE_MEMO set (run_pipeline.py --memo), the runner saves the
+table each stage returns in outputs/cache/stages/, under a key made from
+the stage's fingerprint (its code, its UPPERCASE settings and its inputs;
+see pipeline/manifest.py). When the same stage runs again with the same
+code, settings and inputs, its table is read back from there instead:
+neither its input is read nor process() called.
+
+Unlike --incremental, every version is kept: switching a setting back and
+forth, or going back to an older input file, finds the earlier result.
+
+Results are Arrow files, read back memory-mapped. Other files a stage
+makes (OUTPUT_GRAPH, a report, ...) are kept with its result in a folder
+of the same name and copied back on a hit, so a graph always belongs to
+the table it came with. The whole cache is limited in size
+(PIPELINE_MEMO=1 means DEFAULT_MAX_MB, PIPELINE_MEMO=500 means 500 MB);
+when it is full, the results used least recently are deleted.
+
+A stage that sets MEMOIZE = False always runs.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from pipeline.arrow_files import arrow_table, open_arrow, table_to_frame, write_arrow
+
+MEMO_ENV_VAR = "PIPELINE_MEMO"
+MEMO_DIR = Path(__file__).parent.parent.parent / "outputs" / "cache" / "stages"
+DEFAULT_MAX_MB = 1024
+
+# Bump this when the way results are stored changes, so old entries are ignored
+MEMO_VERSION = 1
+
+
+def memo_limit():
+    """The size limit in bytes from $PIPELINE_MEMO, or None if the cache is off."""
+    value = os.environ.get(MEMO_ENV_VAR, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    if value in ("1", "true", "yes", "on"):
+        return DEFAULT_MAX_MB * 1_000_000
+    return int(float(value) * 1_000_000)
+
+
+def memo_key(fingerprint, **settings):
+    """Key for a stage result: its fingerprint (which covers --compact) plus any other `settings`."""
+    payload = {"version": MEMO_VERSION, "fingerprint": fingerprint, "settings": settings}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def memo_path(key, memo_dir=MEMO_DIR):
+    return Path(memo_dir) / f"{key}.arrow"
+
+
+def _files_dir(key, memo_dir):
+    return Path(memo_dir) / key
+
+
+def load_memo(key, memo_dir=MEMO_DIR, side_files=None):
+    """
+    The remembered table for `key`, or None if there is none (or pyarrow is missing).
+
+    `side_files` ({name: path}, e.g. {"OUTPUT_GRAPH": ...}): the files kept
+    with the result are copied back to these paths.
+    """
+    path = memo_path(key, memo_dir)
+    if not path.exists():
+        return None
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    try:
+        table = open_arrow(path)
+    except (pa.ArrowInvalid, OSError):
+        # Half-written or corrupt file: ignore it, it will be rewritten
+        return None
+
+    for name, target in (side_files or {}).items():
+        kept = _files_dir(key, memo_dir) / name
+        if kept.exists():
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(kept, target)
+
+    # Mark it as just used, so eviction removes other results first
+    path.touch(exist_ok=True)
+    return table_to_frame(table)
+
+
+def save_memo(key, df, max_bytes, memo_dir=MEMO_DIR, side_files=None):
+    """
+    Remember `df` under `key`, with copies of the existing `side_files`
+    ({name: path}), then delete the least recently used results until the
+    folder fits in `max_bytes`.
+
+    Does nothing (returns None) if pyarrow is not installed or `df` alone
+    is bigger than `max_bytes`.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+
+    table = arrow_table(df)
+    if table.nbytes > max_bytes:
+        return None
+
+    path = memo_path(key, memo_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The files first: an entry counts as present once its .arrow file exists
+    files_dir = _files_dir(key, memo_dir)
+    shutil.rmtree(files_dir, ignore_errors=True)
+    for name, source in (side_files or {}).items():
+        if Path(source).is_file():
+            files_dir.mkdir(exist_ok=True)
+            shutil.copyfile(source, files_dir / name)
+    write_arrow(table, path)
+
+    evict(max_bytes, memo_dir, keep=path)
+    return path
+
+
+def evict(max_bytes, memo_dir=MEMO_DIR, keep=None):
+    """Delete the least recently used results until the folder is at most `max_bytes`; return how many."""
+    entries = []
+    for path in Path(memo_dir).glob("*.arrow"):
+        files_dir = _files_dir(path.stem, memo_dir)
+        try:
+            stat = path.stat()
+            size = stat.st_size + sum(file.stat().st_size for file in files_dir.glob("*"))
+        except FileNotFoundError:
+            # Deleted meanwhile by another process
+            continue
+        entries.append((stat.st_mtime, size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        shutil.rmtree(_files_dir(path.stem, memo_dir), ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
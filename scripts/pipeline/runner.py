@@ -0,0 +1,545 @@
+"""
+Run the numbered scripts as stages inside one Python process.
+
+Each numbered script (01_..., 02_..., ...) is imported as a module. The
+runner calls its load() (first script) or reads its INPUT_CSV, then calls
+its process(df), and keeps the result in memory for the scripts that read it.
+Tables that a later stage reads are only written to disk when
+checkpoint=True; tables nobody reads in this run are always saved.
+A script run on its own goes through the same code (pipeline/stage.py).
+
+A stage script provides:
+    OUTPUT_CSV          where its table goes
+    INPUT_CSV           which table it reads (not needed if it has load())
+    load()              optional: produce the input itself (e.g. from Excel)
+    process(df)         return the output table (or None for a stage that
+                        only writes files: then nothing is saved)
+
+and optionally, for running on inputs larger than memory (chunk_rows=N):
+    ROW_LOCAL = True    process() works on any slice of rows independently
+    combine(partials)   process() returns a partial result per chunk (e.g. a
+                        groupby sum) and combine() merges the list of them
+    load_chunks(n)      like load(), but yields chunks of up to n rows
+
+and optionally, to read only part of INPUT_CSV (pushed down into the reader):
+    INPUT_COLUMNS       list of the columns process() uses
+    INPUT_FILTERS       row filters, e.g. [("year", ">=", 2000), ("plant", "in", ["A", "B"])]
+
+and optionally, to stop right away if the input is not what process() expects:
+    INPUT_SCHEMA        {column: dtype}, e.g. {"year": "int", "total_t": "float64"}
+
+Any other INPUT_* / OUTPUT_* path constants (e.g. OUTPUT_GRAPH) are treated
+as extra files the stage reads or writes itself (so a stage table read
+that way is always saved). The runner uses all of them to work out which
+stages depend on which. With jobs > 1, stages that
+do not depend on each other run at the same time in separate processes;
+tables then travel between processes as memory-mapped Arrow files in
+shared memory (see pipeline/handoff.py) instead of being pickled.
+
+With chunk_rows=N, stages that declare ROW_LOCAL or combine() read their
+input from disk in chunks of N rows. ROW_LOCAL stages write their output
+chunk by chunk as well, so the whole table is never in memory at once.
+
+With PIPELINE_COMPACT set (run_pipeline.py --compact), every table is
+shrunk to compact dtypes (see pipeline/dtypes.py) right after process(),
+so it is also kept that small in memory and between processes.
+
+process() gets its own copy-on-write view of an input DataFrame (see
+enable_copy_on_write in pipeline/bootstrap.py), so a stage can change or add
+columns directly, without df.copy(), and only the columns it changes take
+extra memory.
+
+Every stage's read, process and save phases are measured (wall and CPU
+time, peak memory, rows, bytes; see pipeline/instrument.py), as well as
+the time spent importing the script and the libraries it first uses.
+
+What is printed follows PIPELINE_VERBOSITY (see pipeline/verbosity.py).
+
+With PIPELINE_MEMO set (run_pipeline.py --memo), each stage's result is
+remembered under its fingerprint in a size-limited cache (see
+pipeline/memo.py). A stage whose fingerprint was seen before gets its
+table from there, without reading its input or calling process().
+
+With incremental=True every table is saved, and a stage whose fingerprint
+(source, parameters, inputs, --compact; see pipeline/manifest.py) matches the last run
+is skipped, so only the stages affected by an edit run again.
+"""
+
+import importlib.util
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from pipeline.bootstrap import enable_copy_on_write, import_seconds, pd, track_imports
+from pipeline.dtypes import compact_dtypes, compact_tolerance
+from pipeline.handoff import HandoffDir, open_view, publish
+from pipeline.instrument import StageMetrics
+from pipeline.manifest import input_fingerprint, library_hash, load_manifest, save_manifest, stage_fingerprint
+from pipeline.memo import load_memo, memo_key, memo_limit, save_memo
+from pipeline.schema import check_frame
+from pipeline.stage_io import (empty_frame, filter_columns, find_frame, iter_frames, open_frame_writer,
+                               read_frame, select_frame, write_frame)
+from pipeline.verbosity import DEBUG, VERBOSE, enabled, log
+
+SCRIPTS_DIR = Path(__file__).parent.parent
+
+# 01_name.py ... 99_name.py; 00_TEMPLATE.py is not a stage
+STAGE_FILE_PATTERN = re.compile(r"^(\d{2})_\w+\.py$")
+
+
+def discover_stages(scripts_dir=SCRIPTS_DIR):
+    """Return the numbered stage scripts in run order, skipping 00_TEMPLATE.py."""
+    stages = []
+    for path in sorted(Path(scripts_dir).glob("*.py")):
+        match = STAGE_FILE_PATTERN.match(path.name)
+        if match and int(match.group(1)) > 0:
+            stages.append(path)
+    return stages
+
+
+def stage_number(path):
+    return int(Path(path).name[:2])
+
+
+def load_stage(path):
+    """Import a stage script as a module without running its main()."""
+    path = Path(path)
+    spec = importlib.util.spec_from_file_location(f"stage_{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return check_stage(module, path)
+
+
+def check_stage(module, path):
+    """Raise AttributeError if a stage module lacks process() or a way to get its input."""
+    name = Path(path).name
+    if not hasattr(module, "process"):
+        raise AttributeError(f"{name} has no process(df) function")
+    if not hasattr(module, "load") and not hasattr(module, "INPUT_CSV"):
+        raise AttributeError(f"{name} needs either INPUT_CSV or a load() function")
+    return module
+
+
+def table_key(path):
+    """Identify a stage table independent of its file format suffix."""
+    return Path(path).resolve().with_suffix("")
+
+
+def declared_paths(module, prefix):
+    """Return the table keys of every INPUT_* or OUTPUT_* path constant in a stage."""
+    keys = []
+    for name, value in vars(module).items():
+        if name.startswith(prefix) and isinstance(value, (str, Path)):
+            keys.append(table_key(value))
+    return keys
+
+
+def build_graph(modules):
+    """
+    Work out which stages each stage has to wait for.
+
+    Returns a list where entry i is the set of stage indices that stage i
+    depends on. A stage depends on whichever earlier stage declares one of
+    its inputs as an output.
+    """
+    producer = {}
+    depends_on = []
+    for i, module in enumerate(modules):
+        inputs = [] if hasattr(module, "load") else declared_paths(module, "INPUT_")
+        depends_on.append({producer[key] for key in inputs if key in producer})
+        for key in declared_paths(module, "OUTPUT_"):
+            producer[key] = i
+    return depends_on
+
+
+def compute_fingerprints(stage_paths, modules):
+    """
+    Return the fingerprint of every stage, in run order.
+
+    Inputs produced by an earlier stage in this run take that stage's
+    fingerprint; other inputs (the Excel file, tables from stages outside
+    this run) are hashed from disk.
+    """
+    library = library_hash()
+    # Compacting changes the table a stage saves and hands on
+    settings = {"compact": compact_tolerance()}
+    producer_fingerprint = {}
+    fingerprints = []
+    for path, module in zip(stage_paths, modules):
+        inputs = []
+        for name, value in vars(module).items():
+            if name.startswith("INPUT_") and isinstance(value, (str, Path)):
+                key = table_key(value)
+                inputs.append(producer_fingerprint.get(key) or input_fingerprint(value))
+
+        fingerprint = stage_fingerprint(path, module, inputs, library, settings)
+        fingerprints.append(fingerprint)
+        for key in declared_paths(module, "OUTPUT_"):
+            producer_fingerprint[key] = fingerprint
+    return fingerprints
+
+
+# Stage modules already imported in this (worker) process
+_loaded_stages = {}
+
+
+def is_chunkable(module):
+    """True if a stage can process its input chunk by chunk."""
+    return getattr(module, "ROW_LOCAL", False) or hasattr(module, "combine")
+
+
+def streams_output(module, chunk_rows):
+    """True if a stage writes its output chunk by chunk (so it is only on disk)."""
+    return bool(chunk_rows) and getattr(module, "ROW_LOCAL", False)
+
+
+def input_selection(module):
+    """The (columns, filters) a stage asks for; (None, None) means the whole table."""
+    return getattr(module, "INPUT_COLUMNS", None), getattr(module, "INPUT_FILTERS", None)
+
+
+def _read_input(module, df, fmt):
+    """Load a stage's input from wherever it is, keeping only the columns/rows it asks for."""
+    if df is None and hasattr(module, "load"):
+        return module.load()
+
+    columns, filters = input_selection(module)
+    expected = getattr(module, "INPUT_SCHEMA", None)
+    if df is None:
+        return read_frame(module.INPUT_CSV, fmt, columns=columns, filters=filters, expected=expected)
+    if isinstance(df, (str, Path)):
+        # Hand-off file: map only the columns needed
+        needed = None if columns is None else list(columns) + sorted(filter_columns(filters) - set(columns))
+        df = open_view(df, columns=needed)
+    return check_frame(select_frame(df, columns, filters), None, module.INPUT_CSV, expected)
+
+
+def _input_chunks(module, chunk_rows, fmt):
+    if hasattr(module, "load_chunks"):
+        return module.load_chunks(chunk_rows)
+    if hasattr(module, "load"):
+        return [module.load()]
+    columns, filters = input_selection(module)
+    return iter_frames(module.INPUT_CSV, chunk_rows, fmt, columns=columns, filters=filters,
+                       expected=getattr(module, "INPUT_SCHEMA", None))
+
+
+def side_outputs(module):
+    """The files a stage makes besides its table: {constant name: path}, e.g. {"OUTPUT_GRAPH": ...}."""
+    return {name: value for name, value in vars(module).items()
+            if name.startswith("OUTPUT_") and name != "OUTPUT_CSV" and isinstance(value, (str, Path))}
+
+
+def _file_times(files):
+    """{name: modification time} of the files in {name: path}; None for missing ones."""
+    return {name: Path(path).stat().st_mtime_ns if Path(path).exists() else None for name, path in files.items()}
+
+
+def _compact(result, module):
+    """Shrink a stage result to compact dtypes when $PIPELINE_COMPACT is set."""
+    tolerance = compact_tolerance()
+    if tolerance is None or result is None:
+        return result
+    # Only the columns a stage lists in COMPACT_SMALL_INTS may go below int32
+    result, _ = compact_dtypes(result, float_tolerance=tolerance,
+                               small_ints=getattr(module, "COMPACT_SMALL_INTS", ()))
+    return result
+
+
+def _empty_input(module, fmt):
+    """What a stage reads when no chunk arrives: its input columns and dtypes, without rows."""
+    if hasattr(module, "load_chunks"):
+        return pd.DataFrame()
+    columns, _ = input_selection(module)
+    return empty_frame(module.INPUT_CSV, fmt, columns=columns)
+
+
+def _is_frame(obj):
+    """True if `obj` is a DataFrame; never imports pandas (a stage may not use it)."""
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(obj, pandas.DataFrame)
+
+
+def _row_count(obj):
+    """len(obj) for a table (or list), None for anything else, e.g. no table at all."""
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def _next_chunk(chunks, metrics):
+    """The next input chunk, or None at the end; the time spent counts as reading."""
+    with metrics.phase("read") as step:
+        chunk = next(chunks, None)
+        step["rows_out"] = 0 if chunk is None else len(chunk)
+    return chunk
+
+
+def _run_chunked(module, chunk_rows, save, fmt, metrics):
+    """Run a ROW_LOCAL or combine() stage over its input in chunks."""
+    chunks = iter(_input_chunks(module, chunk_rows, fmt))
+
+    if getattr(module, "ROW_LOCAL", False):
+        writer = open_frame_writer(module.OUTPUT_CSV, fmt)
+        try:
+            chunk = _next_chunk(chunks, metrics)
+            if chunk is None:
+                # No rows at all (e.g. INPUT_FILTERS match nothing): save what process()
+                # makes of an empty input, so the output still has its columns and schema
+                chunk = _empty_input(module, fmt)
+            while chunk is not None:
+                with metrics.phase("process", rows_in=len(chunk)) as step:
+                    part = module.process(chunk)
+                    step["rows_out"] = len(part)
+                with metrics.phase("save"):
+                    writer.write(part)
+                chunk = _next_chunk(chunks, metrics)
+        finally:
+            # Closing writes the file footer and the schema, so it counts as saving
+            with metrics.phase("save"):
+                writer.close()
+        log(f"✓ Saved: {writer.path} ({writer.rows} rows, in chunks of {chunk_rows})")
+        return None
+
+    partials = []
+    rows_in = 0
+    while (chunk := _next_chunk(chunks, metrics)) is not None:
+        rows_in += len(chunk)
+        with metrics.phase("process"):
+            partials.append(module.process(chunk))
+    with metrics.phase("process", rows_in=rows_in) as step:
+        result = _compact(module.combine(partials), module)
+        step["rows_out"] = len(result)
+    if save:
+        with metrics.phase("save"):
+            saved_path = write_frame(result, module.OUTPUT_CSV, fmt, compact=False)
+        log(f"✓ Saved: {saved_path}")
+    return result
+
+
+def _run_stage(path, df, save, return_result, fmt, chunk_rows=None, handoff_dir=None, memo=None):
+    """
+    Run one stage: get its input, call process(), optionally save the result.
+
+    `df` is the input table if the runner already has it in memory, the path
+    of a published hand-off file, or None to read it from disk. With a
+    `handoff_dir` the result is published there and its path is returned
+    instead of the DataFrame. With `memo` (key, size limit) the result and
+    the stage's side outputs are taken from or saved to the memo cache. Used both in-process and inside
+    pool workers.
+    """
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    if path not in _loaded_stages:
+        _loaded_stages[path] = load_stage(path)
+    module = _loaded_stages[path]
+
+    metrics = StageMetrics(Path(path).name)
+    # Libraries first imported while this stage runs (see pipeline/bootstrap.py)
+    imports_before = import_seconds()
+    with track_imports():
+        result = _run_stage_phases(module, path, df, save, return_result, fmt, chunk_rows, handoff_dir, memo,
+                                   metrics)
+    metrics.import_seconds = import_seconds() - imports_before
+    return result, metrics.as_dict()
+
+
+def _run_stage_phases(module, path, df, save, return_result, fmt, chunk_rows, handoff_dir, memo, metrics):
+    """The read, process and save phases of _run_stage(); returns the result to hand on."""
+    remembered = None
+    if memo is not None:
+        side_files_before = _file_times(side_outputs(module))
+        with metrics.phase("read") as step:
+            remembered = load_memo(memo[0], side_files=side_outputs(module))
+            step["rows_out"] = None if remembered is None else len(remembered)
+
+    if remembered is not None:
+        log("Unchanged since an earlier run: result taken from the memo cache")
+        result = remembered
+        if save:
+            with metrics.phase("save"):
+                saved_path = write_frame(result, module.OUTPUT_CSV, fmt, compact=False)
+            log(f"✓ Saved: {saved_path}")
+    elif df is None and chunk_rows and is_chunkable(module):
+        # An input that was in memory fits in memory, so only chunk inputs read from disk
+        result = _run_chunked(module, chunk_rows, save, fmt, metrics)
+    else:
+        with metrics.phase("read") as step:
+            df = _read_input(module, df, fmt)
+            step["rows_out"] = _row_count(df)
+        is_frame = _is_frame(df)
+        if is_frame:
+            if enabled(VERBOSE):
+                log(f"Input: {df.shape[0]} rows, {df.shape[1]} columns", VERBOSE)
+            if enabled(DEBUG):
+                log(f"Columns: {df.columns.tolist()}\nFirst rows:\n{df.head()}\n", DEBUG)
+            # A shallow copy: with copy-on-write process() may add or change columns
+            # without touching the table other stages read, and only what it changes is copied
+            enable_copy_on_write()
+            df = df.copy(deep=False)
+        with metrics.phase("process", rows_in=_row_count(df)) as step:
+            result = _compact(module.process(df), module)
+            del df
+            step["rows_out"] = _row_count(result)
+
+        if result is None:
+            log("No table returned by process(): nothing to save", VERBOSE)
+        elif save:
+            with metrics.phase("save"):
+                saved_path = write_frame(result, module.OUTPUT_CSV, fmt, compact=False)
+            log(f"✓ Saved: {saved_path}")
+
+    if memo is not None and remembered is None and result is not None:
+        with metrics.phase("save"):
+            # Only files this run wrote: an older graph may belong to other settings
+            after = _file_times(side_outputs(module))
+            written = {name: path for name, path in side_outputs(module).items()
+                       if after[name] is not None and after[name] != side_files_before[name]}
+            save_memo(memo[0], result, memo[1], side_files=written)
+
+    if not return_result or result is None:
+        result = None
+    elif handoff_dir is not None:
+        with metrics.phase("save"):
+            result = str(publish(result, Path(handoff_dir) / f"{Path(path).stem}.arrow"))
+    return result
+
+
+def run_pipeline(stage_paths, checkpoint=False, fmt=None, jobs=1, incremental=False, chunk_rows=None,
+                 modules=None):
+    """
+    Run the given stage scripts, passing tables in memory.
+
+    jobs=1 runs the stages one after another in this process. jobs > 1 runs
+    independent stages concurrently in a pool of worker processes.
+    incremental=True skips stages that are up to date (and saves every table).
+    chunk_rows=N runs chunkable stages out of core (see module docstring).
+    With $PIPELINE_MEMO set, stage results come from or go to the memo cache.
+    modules: the stage modules, already loaded (e.g. with their paths changed
+    by the benchmark). Use with jobs=1: worker processes may load the
+    scripts from their files again.
+    Returns a dict {stage file name: measurements (see StageMetrics.as_dict)};
+    skipped stages are left out.
+    """
+    stage_paths = [Path(path) for path in stage_paths]
+    # Importing a script runs its top-level imports; that time is added to the stage's import time
+    load_seconds = [0.0] * len(stage_paths)
+    if modules is None:
+        modules = []
+        for i, path in enumerate(stage_paths):
+            start = time.perf_counter()
+            modules.append(load_stage(path))
+            load_seconds[i] = time.perf_counter() - start
+    # Run exactly these modules, rather than importing each script a second time
+    _loaded_stages.update(zip(map(str, stage_paths), modules))
+    depends_on = build_graph(modules)
+
+    memo_bytes = memo_limit()
+    if incremental or memo_bytes:
+        fingerprints = compute_fingerprints(stage_paths, modules)
+    if incremental:
+        # Skipped stages' tables must be on disk for the stages after them
+        checkpoint = True
+        manifest = load_manifest()
+
+    def up_to_date(i):
+        return (
+            incremental
+            and manifest.get(stage_paths[i].name) == fingerprints[i]
+            and find_frame(modules[i].OUTPUT_CSV, fmt) is not None
+        )
+
+    # How many stages in this run read each table, so it can be dropped once all have
+    readers_left = {}
+    for module in modules:
+        if not hasattr(module, "load"):
+            key = table_key(module.INPUT_CSV)
+            readers_left[key] = readers_left.get(key, 0) + 1
+    # Tables a stage reads itself through another INPUT_* path (e.g. INPUT_SCOPES)
+    # are not handed over in memory, so they always have to be saved
+    read_from_disk = {
+        table_key(value)
+        for module in modules
+        for name, value in vars(module).items()
+        if name.startswith("INPUT_") and name != "INPUT_CSV" and isinstance(value, (str, Path))
+    }
+
+    # Tables kept for later stages: DataFrames, or hand-off file paths with jobs > 1
+    tables = {}
+    report = {}
+    handoff_dir = None
+
+    def stage_args(i):
+        module = modules[i]
+        df = None
+        if not hasattr(module, "load"):
+            df = tables.get(table_key(module.INPUT_CSV))
+        out_key = table_key(module.OUTPUT_CSV)
+        read_later = readers_left.get(out_key, 0) > 0
+        if df is None and streams_output(module, chunk_rows):
+            # Output is written chunk by chunk; later stages read it back from disk
+            read_later = False
+        memo = None
+        if memo_bytes and getattr(module, "MEMOIZE", True):
+            memo = (memo_key(fingerprints[i]), memo_bytes)
+        save = checkpoint or not read_later or out_key in read_from_disk
+        return (str(stage_paths[i]), df, save, read_later, fmt, chunk_rows, handoff_dir, memo)
+
+    def finish(i, result, metrics):
+        module = modules[i]
+        if incremental and metrics is not None:
+            manifest[stage_paths[i].name] = fingerprints[i]
+            save_manifest(manifest)
+        if not hasattr(module, "load"):
+            key = table_key(module.INPUT_CSV)
+            readers_left[key] -= 1
+            if readers_left[key] == 0:
+                dropped = tables.pop(key, None)
+                if isinstance(dropped, str):
+                    Path(dropped).unlink(missing_ok=True)
+        if result is not None:
+            tables[table_key(module.OUTPUT_CSV)] = result
+        if metrics is not None:
+            metrics["import_s"] += load_seconds[i]
+            report[stage_paths[i].name] = metrics
+
+    if jobs <= 1:
+        for i, path in enumerate(stage_paths):
+            if up_to_date(i):
+                log(f"\n>>> [{i + 1}/{len(stage_paths)}] {path.name}: up to date, skipped")
+                finish(i, None, None)
+                continue
+            log(f"\n>>> [{i + 1}/{len(stage_paths)}] {path.name}")
+            result, metrics = _run_stage(*stage_args(i))
+            finish(i, result, metrics)
+        return report
+
+    done = set()
+    running = {}
+    with HandoffDir() as handoff, ProcessPoolExecutor(max_workers=jobs) as pool:
+        handoff_dir = str(handoff.path)
+        while len(done) < len(stage_paths):
+            for i in range(len(stage_paths)):
+                if i not in done and i not in running.values() and depends_on[i] <= done:
+                    if up_to_date(i):
+                        log(f">>> {stage_paths[i].name}: up to date, skipped")
+                        finish(i, None, None)
+                        done.add(i)
+                        continue
+                    log(f">>> started {stage_paths[i].name}")
+                    running[pool.submit(_run_stage, *stage_args(i))] = i
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = running.pop(future)
+                result, metrics = future.result()
+                finish(i, result, metrics)
+                done.add(i)
+                log(f">>> finished {stage_paths[i].name} ({metrics['wall_s']:.3f} s)")
+
+    return report
@@ -0,0 +1,127 @@
+"""
+Evaluate many emission scenarios in one broadcasted pass.
+
+Instead of editing OVERLOAD_FRAC (or a grid EF, clinker ratio, ...) and
+rerunning the pipeline, describe the values you want to try and get one
+tidy table back with a row per scenario and year.
+
+Each entry in `params` is either:
+    - a list of values for one setting or input column, e.g.
+          "overload_frac": [0.4, 0.6, 0.8]
+          "grid_ef_kg_per_kwh": [0.45, 0.71]
+    - a dict of named sets that override several columns together, e.g.
+          "distances": {
+              "base": {},
+              "far":  {"dist_local_km": 700, "dist_exp_n_km": 1200, "dist_exp_s_km": 300},
+          }
+
+Every combination is one scenario. Besides the input columns in
+emissions.REQUIRED_COLUMNS you can vary "overload_frac", "allowed_frac"
+(defaults to 1 - overload_frac) and "calc_ef_is_per_clinker".
+
+Usage:
+    results = run_scenarios(df, {"overload_frac": [0.4, 0.6], "clinker_ratio": [0.7, 0.8]})
+"""
+
+import itertools
+
+from pipeline.bootstrap import np, pd
+from pipeline.emissions import REQUIRED_COLUMNS, SCOPE_COLUMNS, missing_columns, scope_arrays
+
+SETTINGS = ("overload_frac", "allowed_frac", "calc_ef_is_per_clinker")
+
+
+def scenario_grid(params):
+    """
+    Expand `params` into every combination.
+
+    Returns (labels_df, overrides): labels_df has one row per scenario with
+    the chosen value (or set name) for each parameter; overrides is a list
+    with, per scenario, a dict {column or setting: value}.
+    """
+    names = list(params)
+    options = []
+    for name in names:
+        values = params[name]
+        if isinstance(values, dict):
+            options.append(list(values.items()))
+        else:
+            options.append([(value, {name: value}) for value in values])
+
+    labels = []
+    overrides = []
+    for combo in itertools.product(*options):
+        labels.append({name: label for name, (label, _) in zip(names, combo)})
+        merged = {}
+        for _, override in combo:
+            merged.update(override)
+        overrides.append(merged)
+
+    unknown = {key for override in overrides for key in override} - set(REQUIRED_COLUMNS) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown scenario parameters: {sorted(unknown)}")
+
+    labels_df = pd.DataFrame(labels)
+    labels_df.insert(0, "scenario", np.arange(len(labels_df)))
+    return labels_df, overrides
+
+
+def _scenario_values(overrides, key, default):
+    """Per-scenario values of one key as a (scenarios, 1) array, NaN where not overridden."""
+    values = np.array([override.get(key, np.nan) for override in overrides], dtype=np.float64)
+    if default is not None:
+        values = np.where(np.isnan(values), default, values)
+    return values[:, None]
+
+
+def _evaluate(base, overrides, calc_ef_is_per_clinker, overload_frac):
+    """Scope arrays of shape (len(overrides), rows) for one batch of scenarios."""
+    col = {}
+    for name, base_values in base.items():
+        if any(name in override for override in overrides):
+            values = _scenario_values(overrides, name, None)
+            col[name] = np.where(np.isnan(values), base_values[None, :], values)
+        else:
+            col[name] = base_values[None, :]
+
+    overload = _scenario_values(overrides, "overload_frac", overload_frac)
+    allowed = _scenario_values(overrides, "allowed_frac", np.nan)
+    allowed = np.where(np.isnan(allowed), 1.0 - overload, allowed)
+    per_clinker = _scenario_values(overrides, "calc_ef_is_per_clinker", float(calc_ef_is_per_clinker)) > 0.5
+
+    return scope_arrays(col, per_clinker, overload, allowed)
+
+
+def run_scenarios(df, params, id_columns=("year",), calc_ef_is_per_clinker=True,
+                  overload_frac=0.60, batch_size=5000):
+    """
+    Evaluate every scenario in `params` against the rows of `df`.
+
+    `df` must have the canonical columns (see emissions.REQUIRED_COLUMNS).
+    Returns a long table with columns: scenario, one column per parameter,
+    the `id_columns` found in `df` (e.g. year, plant) and the SCOPE_COLUMNS.
+    Scenarios are evaluated `batch_size` at a time to bound memory use.
+    """
+    missing = missing_columns(df)
+    if missing:
+        raise KeyError(f"Missing columns for emissions calculation: {missing}")
+
+    labels_df, overrides = scenario_grid(params)
+    base = {name: df[name].to_numpy(dtype=np.float64) for name in REQUIRED_COLUMNS}
+    ids = [col for col in id_columns if col in df.columns]
+    n_rows = len(df)
+
+    parts = []
+    for start in range(0, len(overrides), batch_size):
+        batch = overrides[start:start + batch_size]
+        out = _evaluate(base, batch, calc_ef_is_per_clinker, overload_frac)
+
+        scenario_rows = np.repeat(np.arange(start, start + len(batch)), n_rows)
+        part = labels_df.iloc[scenario_rows].reset_index(drop=True)
+        for col in ids:
+            part[col] = np.tile(df[col].to_numpy(), len(batch))
+        for name in SCOPE_COLUMNS:
+            part[name] = np.broadcast_to(out[name], (len(batch), n_rows)).ravel()
+        parts.append(part)
+
+    return pd.concat(parts, ignore_index=True)
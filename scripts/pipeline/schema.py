@@ -0,0 +1,163 @@
+"""
+The schema saved next to every stage table.
+
+write_frame() saves NAME.schema.json beside each output, listing every
+column with its dtype, its unit (from the second Excel header row, when
+the sheet has one) and whether it may contain missing values:
+
+    {"version": 1, "columns": [
+        {"name": "year", "dtype": "int64", "unit": "", "nullable": false},
+        {"name": "cement_t", "dtype": "float64", "unit": "tons", "nullable": false},
+        ...]}
+
+read_frame() uses it to read CSV files with the exact dtypes (no guessing,
+dates parsed once) and checks every table it reads against it, so a table
+that does not match fails right away instead of many scripts later.
+
+Units travel with a DataFrame in df.attrs["units"] ({column: unit}).
+"""
+
+import json
+from pathlib import Path
+
+from pipeline.bootstrap import pd
+
+SCHEMA_VERSION = 1
+
+
+def schema_path(path):
+    """Schema file that belongs to the stage table `path`."""
+    return Path(path).with_suffix(".schema.json")
+
+
+def frame_units(df):
+    """The {column: unit} dict carried in df.attrs (empty if there are no units)."""
+    return dict(df.attrs.get("units") or {})
+
+
+def frame_schema(df):
+    """Describe the columns of `df`: name, dtype, unit and nullability."""
+    units = frame_units(df)
+    return {
+        "version": SCHEMA_VERSION,
+        "columns": [
+            {
+                "name": str(name),
+                "dtype": str(df[name].dtype),
+                "unit": units.get(name, ""),
+                "nullable": bool(df[name].isna().any()),
+            }
+            for name in df.columns
+        ],
+    }
+
+
+def merge_nullable(schema, other):
+    """Combine the schemas of two chunks of the same table: a column is nullable if it is in either."""
+    nullable = {col["name"]: col["nullable"] for col in other["columns"]}
+    for col in schema["columns"]:
+        col["nullable"] = col["nullable"] or nullable.get(col["name"], False)
+    return schema
+
+
+def save_schema(schema, path):
+    """Write `schema` next to the stage table `path`."""
+    schema_path(path).write_text(json.dumps(schema, indent=2))
+
+
+def load_schema(path):
+    """The schema saved for the stage table `path`, or None (e.g. a table from an older run)."""
+    sidecar = schema_path(path)
+    if not sidecar.exists():
+        return None
+    schema = json.loads(sidecar.read_text())
+    if schema.get("version") != SCHEMA_VERSION:
+        return None
+    return schema
+
+
+def csv_read_options(schema, usecols=None):
+    """
+    Keyword arguments for pd.read_csv() that give the saved dtypes directly.
+
+    Text columns are read as text even if they look like numbers (e.g. a
+    plant code "007"), and date columns are parsed in the same pass. Only
+    empty fields are missing values (that is how to_csv() writes them), so
+    text such as "n/a" or "NA" comes back as it was saved.
+    """
+    dtype = {}
+    parse_dates = []
+    for col in schema["columns"]:
+        name, kind = col["name"], col["dtype"]
+        if usecols is not None and name not in usecols:
+            continue
+        if kind.startswith("datetime"):
+            parse_dates.append(name)
+        elif kind in ("object", "str", "string"):
+            dtype[name] = str
+        else:
+            dtype[name] = kind
+
+    options = {"dtype": dtype, "keep_default_na": False, "na_values": [""]}
+    if parse_dates:
+        options.update(parse_dates=parse_dates, date_format="ISO8601")
+    return options
+
+
+def _dtype_matches(actual, expected):
+    """True if dtype name `actual` is `expected` or, for a family like "int", one of its sizes."""
+    if actual == expected:
+        return True
+    if expected in ("str", "object", "string"):
+        return actual in ("str", "object", "string")
+    return expected in ("int", "float", "datetime") and actual.startswith(expected)
+
+
+def check_frame(df, schema, path, expected=None):
+    """
+    Raise ValueError if `df` (read from `path`) does not match its saved schema.
+
+    Checks that the columns exist with the saved dtype, and that columns
+    saved as non-nullable have no missing values. `expected` ({column:
+    dtype}, e.g. a stage's INPUT_SCHEMA) is checked as well; "int",
+    "float" and "datetime" there accept any size. Sets df.attrs["units"].
+    """
+    saved = {col["name"]: col for col in schema["columns"]} if schema else {}
+    problems = []
+
+    for name, col in saved.items():
+        if name not in df.columns:
+            continue
+        actual = str(df[name].dtype)
+        # Text is text: an object column saved to CSV comes back as str
+        if not _dtype_matches(actual, col["dtype"]):
+            problems.append(f"'{name}' is {actual}, schema says {col['dtype']}")
+        elif not col["nullable"] and df[name].isna().any():
+            problems.append(f"'{name}' has missing values, schema says it has none")
+
+    if schema:
+        extra = [name for name in df.columns if name not in saved]
+        if extra:
+            problems.append(f"columns not in the schema: {extra}")
+
+    for name, dtype in (expected or {}).items():
+        if name not in df.columns:
+            problems.append(f"'{name}' is missing (expected {dtype})")
+        elif not _dtype_matches(str(df[name].dtype), dtype):
+            problems.append(f"'{name}' is {df[name].dtype}, expected {dtype}")
+
+    if problems:
+        raise ValueError(f"{path} does not match its schema:\n  " + "\n  ".join(problems))
+
+    units = {name: col["unit"] for name, col in saved.items() if col["unit"] and name in df.columns}
+    if units:
+        df.attrs["units"] = units
+    return df
+
+
+def read_csv_typed(path, schema, usecols=None, **kwargs):
+    """pd.read_csv() with the dtypes from `schema`; values that don't fit raise ValueError."""
+    try:
+        return pd.read_csv(path, usecols=usecols, **csv_read_options(schema, usecols), **kwargs)
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"{path} does not match its schema: {error}") from error
@@ -0,0 +1,54 @@
+"""
+Running a stage script on its own.
+
+A stage script only holds its settings (INPUT_CSV, OUTPUT_CSV, ...) and
+its process(df) function (see pipeline/runner.py for the full list).
+Everything around it - finding the input in whatever format it was saved,
+checking it, timing every step, compacting and saving the result - is
+done here, the same way run_pipeline.py does it:
+
+    def process(df):
+        ...
+        return result_df
+
+    if __name__ == "__main__":
+        run_script(__name__)
+
+So an improvement to reading or saving tables applies to every script at
+once, whether it runs on its own or as part of the whole pipeline.
+"""
+
+import sys
+from pathlib import Path
+
+from pipeline.instrument import print_summary
+from pipeline.runner import check_stage, run_pipeline
+from pipeline.stage_io import find_frame
+from pipeline.verbosity import BATCH, enabled, log
+
+
+def run_script(name, fmt=None, chunk_rows=None):
+    """
+    Run the stage module `name` (a script passes its __name__) on its own.
+
+    Reads INPUT_CSV (or calls load()), runs process(), saves the result to
+    OUTPUT_CSV and prints how long each step took. `fmt` and `chunk_rows`
+    work as in run_pipeline(). Exits with an error message if the input
+    table has not been made yet.
+    """
+    module = sys.modules[name]
+    path = Path(module.__file__)
+    check_stage(module, path)
+
+    if not hasattr(module, "load") and find_frame(module.INPUT_CSV, fmt) is None:
+        print(f"ERROR: Input file not found: {module.INPUT_CSV}")
+        print("Run the script that creates it first (or all of them: python scripts/run_pipeline.py)")
+        sys.exit(1)
+
+    report = run_pipeline([path], checkpoint=True, fmt=fmt, chunk_rows=chunk_rows, modules=[module])
+
+    if enabled(BATCH):
+        print()
+        print_summary(report.values())
+    log("\n✓ DONE! Ready for next script.")
+    return report
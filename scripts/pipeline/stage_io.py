@@ -0,0 +1,494 @@
+"""
+Reading and writing the tables that stages hand to each other.
+
+Scripts still name their files with INPUT_CSV / OUTPUT_CSV, but the file
+format is chosen per run with the PIPELINE_FORMAT environment variable:
+
+    PIPELINE_FORMAT=parquet python scripts/02_example_next_step.py   (default)
+    PIPELINE_FORMAT=feather python scripts/02_example_next_step.py
+    PIPELINE_FORMAT=csv     python scripts/02_example_next_step.py
+
+Parquet and Feather (Arrow IPC) keep the exact dtypes and float values and
+are read memory-mapped. CSV is kept for files you want to open in Excel.
+Every table gets a NAME.schema.json next to it (see pipeline/schema.py):
+CSV files are read with exactly those dtypes, and every read is checked
+against it.
+The file suffix follows the format: OUTPUT_CSV "02_results.csv" is saved
+as "02_results.parquet" when the format is parquet.
+
+Usage:
+    df = read_frame(INPUT_CSV)
+    write_frame(result_df, OUTPUT_CSV)
+
+    # Only some columns and rows (pushed down into the Parquet reader):
+    df = read_frame(INPUT_CSV, columns=["year", "total_t"], filters=[("year", ">=", 2000)])
+
+    # Fail right away if the input does not have the columns you rely on:
+    df = read_frame(INPUT_CSV, expected={"year": "int", "total_t": "float64"})
+
+    # Shrink dtypes (float32, int32, categories) before saving;
+    # also on for every save when PIPELINE_COMPACT=1 (see pipeline/dtypes.py):
+    write_frame(result_df, OUTPUT_CSV, compact=True)
+
+    # Or, for tables too big to hold in memory, one chunk at a time:
+    with open_frame_writer(OUTPUT_CSV) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+"""
+
+import operator
+import os
+from pathlib import Path
+
+from pipeline.arrow_files import arrow_safe
+from pipeline.bootstrap import np, pd
+from pipeline.dtypes import DEFAULT_FLOAT_TOLERANCE, compact_dtypes, compact_tolerance
+from pipeline.instrument import count_read, count_written
+from pipeline.schema import check_frame, frame_schema, load_schema, merge_nullable, read_csv_typed, save_schema
+
+FORMAT_ENV_VAR = "PIPELINE_FORMAT"
+DEFAULT_FORMAT = "parquet"
+
+
+class CsvFormat:
+    name = "csv"
+    suffix = ".csv"
+
+    def read(self, path, columns=None, filters=None, schema=None):
+        usecols = _needed_columns(columns, filters)
+        if schema is not None and not schema["columns"]:
+            # Written by a chunk writer that got no chunks at all
+            return pd.DataFrame()
+        if schema is None:
+            df = pd.read_csv(path, usecols=usecols)
+        else:
+            df = read_csv_typed(path, schema, usecols)
+        return select_frame(df, columns, filters)
+
+    def prepare(self, df):
+        return df
+
+    def write(self, df, path):
+        df.to_csv(path, index=False)
+
+    def writer(self, path):
+        return _CsvChunkWriter(path)
+
+    def iter_chunks(self, path, chunk_rows, columns=None, filters=None, schema=None):
+        usecols = _needed_columns(columns, filters)
+        if schema is not None and not schema["columns"]:
+            return
+        if schema is None:
+            reader = pd.read_csv(path, usecols=usecols, chunksize=chunk_rows)
+        else:
+            reader = read_csv_typed(path, schema, usecols, chunksize=chunk_rows)
+        for chunk in reader:
+            chunk = select_frame(chunk, columns, filters)
+            if len(chunk):
+                yield chunk
+
+
+class ParquetFormat:
+    name = "parquet"
+    suffix = ".parquet"
+
+    def read(self, path, columns=None, filters=None, schema=None):
+        import pyarrow.parquet as pq
+
+        # Only the requested columns are decoded, and row groups whose min/max
+        # statistics cannot match the filters are skipped without reading them
+        table = pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+        return table.to_pandas()
+
+    def prepare(self, df):
+        return arrow_safe(df)
+
+    def write(self, df, path):
+        df.to_parquet(path, index=False)
+
+    def writer(self, path):
+        import pyarrow.parquet as pq
+
+        # Each chunk becomes one row group
+        return _ArrowChunkWriter(path, lambda sink, schema: pq.ParquetWriter(sink, schema))
+
+    def iter_chunks(self, path, chunk_rows, columns=None, filters=None, schema=None):
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        dataset = ds.dataset(path, format="parquet")
+        expression = pq.filters_to_expression(filters) if filters else None
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=chunk_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+class FeatherFormat:
+    name = "feather"
+    suffix = ".feather"
+
+    def read(self, path, columns=None, filters=None, schema=None):
+        import pyarrow.feather as feather
+
+        table = feather.read_table(path, columns=_needed_columns(columns, filters), memory_map=True)
+        return _select_table(table, columns, filters).to_pandas(split_blocks=True)
+
+    def prepare(self, df):
+        return arrow_safe(df)
+
+    def write(self, df, path):
+        # Uncompressed so the file can be memory-mapped without decoding
+        df.reset_index(drop=True).to_feather(path, compression="uncompressed")
+
+    def writer(self, path):
+        import pyarrow as pa
+
+        return _ArrowChunkWriter(path, lambda sink, schema: pa.ipc.new_file(sink, schema))
+
+    def iter_chunks(self, path, chunk_rows, columns=None, filters=None, schema=None):
+        import pyarrow.feather as feather
+
+        # Memory-mapped: only the pages of the slice being converted are read
+        table = feather.read_table(path, columns=_needed_columns(columns, filters), memory_map=True)
+        for start in range(0, table.num_rows, chunk_rows):
+            chunk = _select_table(table.slice(start, chunk_rows), columns, filters)
+            if chunk.num_rows:
+                yield chunk.to_pandas(split_blocks=True)
+
+
+class _CsvChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self._first = True
+
+    def write(self, df):
+        df.to_csv(self.path, index=False, mode="w" if self._first else "a", header=self._first)
+        self._first = False
+
+    def close(self):
+        if self._first:
+            # No chunks at all: still leave an (empty) file behind
+            Path(self.path).write_text("")
+
+
+class _ArrowChunkWriter:
+    """Writes chunks to a Parquet or Arrow IPC file; the first chunk fixes the schema."""
+
+    def __init__(self, path, open_writer):
+        self.path = path
+        self._open_writer = open_writer
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            # A column with only missing values has no type yet: store it as text
+            fields = [field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                      for field in table.schema]
+            self._schema = pa.schema(fields, metadata=table.schema.metadata)
+            table = table.cast(self._schema)
+            self._writer = self._open_writer(str(self.path), self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is None:
+            # No chunks at all: still leave an (empty) file behind
+            import pyarrow as pa
+
+            self._writer = self._open_writer(str(self.path), pa.schema([]))
+        self._writer.close()
+
+
+def _is_text(dtype):
+    return pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+
+
+def like_first_chunk(df, dtypes):
+    """
+    Convert a later chunk to the column `dtypes` of the first one, so the
+    whole table has one type per column (see FrameWriter).
+
+    Raises ValueError naming the column if a value does not fit, e.g. text
+    in a column that was numeric in the first chunk.
+    """
+    if list(df.columns) != list(dtypes.index):
+        raise ValueError(f"Chunk columns {list(df.columns)} differ from the first chunk's {list(dtypes.index)}")
+
+    changed = {}
+    for name, dtype in dtypes.items():
+        col = df[name]
+        if col.dtype == dtype:
+            continue
+        if _is_text(dtype):
+            changed[name] = col.where(col.isna(), col.astype(str)).astype(dtype)
+            continue
+        try:
+            values = pd.to_numeric(col) if pd.api.types.is_numeric_dtype(dtype) else col
+            if pd.api.types.is_integer_dtype(dtype) and (values.isna().any() or (values % 1 != 0).any()):
+                raise ValueError("it has missing or non-whole values")
+            changed[name] = values.astype(dtype)
+        except (ValueError, TypeError) as error:
+            raise ValueError(
+                f"Column '{name}' is {dtype} in the first chunk, but a later chunk "
+                f"has values that do not fit ({error}). Give the column one type in every "
+                f"chunk, e.g. with the `dtypes` of iter_sheet_chunks() (\"str\" for text)."
+            ) from error
+    return df.assign(**changed) if changed else df
+
+
+class FrameWriter:
+    """Context manager returned by open_frame_writer(); call write(chunk) per chunk."""
+
+    def __init__(self, chunk_writer, fmt):
+        self._chunk_writer = chunk_writer
+        self._fmt = fmt
+        self.path = chunk_writer.path
+        self.rows = 0
+        self._schema = None
+        self._dtypes = None
+
+    def write(self, df):
+        df = self._fmt.prepare(df)
+        if self._dtypes is None:
+            self._dtypes = df.dtypes
+        else:
+            df = like_first_chunk(df, self._dtypes)
+        self._chunk_writer.write(df)
+        self.rows += len(df)
+        # The first chunk fixes the dtypes; any chunk with missing values makes a column nullable
+        chunk_schema = frame_schema(df)
+        self._schema = chunk_schema if self._schema is None else merge_nullable(self._schema, chunk_schema)
+
+    def close(self):
+        self._chunk_writer.close()
+        if self._schema is None:
+            # No chunks: the file has no columns, and the schema must say so (not an older one)
+            self._schema = frame_schema(pd.DataFrame())
+        save_schema(self._schema, self.path)
+        count_written(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_FILTER_OPS = {
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "in": lambda col, values: col.isin(values),
+    "not in": lambda col, values: ~col.isin(values),
+}
+
+
+def _filter_groups(filters):
+    """Filters as a list of AND-groups: [(col, op, value), ...] or [[...], [...]] (OR of ANDs)."""
+    if not filters:
+        return []
+    if isinstance(filters[0], tuple):
+        return [filters]
+    return filters
+
+
+def filter_columns(filters):
+    """Names of the columns that the filters look at."""
+    return {name for group in _filter_groups(filters) for name, _, _ in group}
+
+
+def _needed_columns(columns, filters):
+    """Columns to read so the filters can still be applied (None = all)."""
+    if columns is None:
+        return None
+    return list(columns) + sorted(filter_columns(filters) - set(columns))
+
+
+def select_frame(df, columns=None, filters=None):
+    """
+    Keep the rows matching `filters` and the `columns` of a DataFrame.
+
+    Filters use the pyarrow/Parquet form: a list of (column, op, value)
+    tuples that must all hold, or a list of such lists (any may hold).
+    Ops: = == != < <= > >= in, not in.
+    """
+    groups = _filter_groups(filters)
+    if groups:
+        mask = np.zeros(len(df), dtype=bool)
+        for group in groups:
+            group_mask = np.ones(len(df), dtype=bool)
+            for name, op, value in group:
+                group_mask &= np.asarray(_FILTER_OPS[op](df[name], value))
+            mask |= group_mask
+        df = df[mask].reset_index(drop=True)
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+def _select_table(table, columns, filters):
+    """select_frame() for a pyarrow Table, so filtered-out rows are never converted."""
+    if filters:
+        import pyarrow.parquet as pq
+
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(list(columns))
+    return table
+
+
+FORMATS = {fmt.name: fmt for fmt in (ParquetFormat(), FeatherFormat(), CsvFormat())}
+
+
+def _have_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_format(name=None):
+    """
+    Return the format object to use for this run.
+
+    Uses `name` if given, otherwise $PIPELINE_FORMAT, otherwise parquet.
+    Binary formats need pyarrow; without it the default falls back to CSV.
+    """
+    if name is None:
+        name = os.environ.get(FORMAT_ENV_VAR)
+        if name is None:
+            name = DEFAULT_FORMAT if _have_pyarrow() else "csv"
+
+    name = name.lower()
+    if name not in FORMATS:
+        raise ValueError(f"Unknown pipeline format '{name}'. Choose from: {sorted(FORMATS)}")
+    return FORMATS[name]
+
+
+def output_path(path, fmt=None):
+    """Return `path` with the suffix of the chosen format."""
+    return Path(path).with_suffix(get_format(fmt).suffix)
+
+
+def find_frame(path, fmt=None):
+    """
+    Return the existing file for a stage table, or None if there is none.
+
+    The file in the chosen format is returned whenever it exists, so a
+    stale file in another format is never picked over it. Only if there is
+    none (e.g. the table was saved in another format by an earlier run) is
+    the newest file in another format returned.
+    """
+    preferred = output_path(path, fmt)
+    if preferred.exists():
+        return preferred
+    others = [
+        Path(path).with_suffix(other.suffix)
+        for other in FORMATS.values()
+        if other.suffix != preferred.suffix
+    ]
+    existing = [candidate for candidate in others if candidate.exists()]
+    if not existing:
+        return None
+    return max(existing, key=lambda candidate: candidate.stat().st_mtime)
+
+
+def read_frame(path, fmt=None, columns=None, filters=None, expected=None):
+    """
+    Read a stage table saved by write_frame(), whatever format it was saved in.
+
+    `columns` and `filters` (see select_frame) limit what is read; Parquet
+    skips the other columns and non-matching row groups entirely. The table
+    is checked against its saved schema and against `expected` ({column:
+    dtype}, see pipeline/schema.py); a mismatch raises ValueError.
+    """
+    found = find_frame(path, fmt)
+    if found is None:
+        raise FileNotFoundError(f"No stage output found for {path}")
+
+    reader = next(f for f in FORMATS.values() if f.suffix == found.suffix)
+    schema = load_schema(found)
+    count_read(found)
+    df = reader.read(found, columns=columns, filters=filters, schema=schema)
+    return check_frame(df, schema, found, expected)
+
+
+def iter_frames(path, chunk_rows, fmt=None, columns=None, filters=None, expected=None):
+    """Read a stage table in chunks of up to `chunk_rows` rows, without loading it all."""
+    found = find_frame(path, fmt)
+    if found is None:
+        raise FileNotFoundError(f"No stage output found for {path}")
+
+    reader = next(f for f in FORMATS.values() if f.suffix == found.suffix)
+    schema = load_schema(found)
+    count_read(found)
+    for chunk in reader.iter_chunks(found, chunk_rows, columns=columns, filters=filters, schema=schema):
+        yield check_frame(chunk, schema, found, expected)
+
+
+def empty_frame(path, fmt=None, columns=None):
+    """
+    The stage table `path` (only `columns`, if given) with its dtypes and
+    units but no rows, e.g. to see which columns process() makes of it.
+    """
+    found = find_frame(path, fmt)
+    if found is None:
+        raise FileNotFoundError(f"No stage output found for {path}")
+
+    schema = load_schema(found)
+    reader = next(f for f in FORMATS.values() if f.suffix == found.suffix)
+    if schema is None:
+        # A table from an older run: its first row shows the columns and dtypes
+        first = next(iter(reader.iter_chunks(found, 1, columns=columns)), None)
+        return (first if first is not None else reader.read(found, columns=columns)).head(0)
+
+    saved = {col["name"]: col for col in schema["columns"]}
+    names = list(saved) if columns is None else list(columns)
+    missing = [name for name in names if name not in saved]
+    if missing:
+        raise ValueError(f"{found} has no columns {missing}")
+    df = pd.DataFrame({name: pd.Series(dtype=saved[name]["dtype"]) for name in names})
+    return check_frame(df, schema, found)
+
+
+def write_frame(df, path, fmt=None, compact=None):
+    """
+    Save a stage table in the chosen format and return the path written.
+
+    With compact=True (or a float tolerance) the dtypes are shrunk first,
+    see pipeline/dtypes.py. compact=None uses $PIPELINE_COMPACT.
+    """
+    tolerance = compact_tolerance() if compact is None else compact
+    if tolerance is True:
+        tolerance = DEFAULT_FLOAT_TOLERANCE
+    if tolerance:
+        df, _ = compact_dtypes(df, float_tolerance=tolerance)
+
+    fmt = get_format(fmt)
+    path = output_path(path, fmt.name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The schema describes the table as stored, so it is taken after prepare()
+    df = fmt.prepare(df)
+    fmt.write(df, path)
+    save_schema(frame_schema(df), path)
+    count_written(path)
+    return path
+
+
+def open_frame_writer(path, fmt=None):
+    """
+    Open a writer that saves a stage table chunk by chunk.
+
+    Every chunk must have the same columns. The first chunk fixes the
+    dtypes and later chunks are converted to them (ValueError if a value
+    does not fit, see like_first_chunk()); an object column with only
+    missing values in the first chunk is saved as text. Chunks are not compacted: a small int
+    type that fits the first chunk may not fit the next one.
+    """
+    fmt = get_format(fmt)
+    path = output_path(path, fmt.name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return FrameWriter(fmt.writer(path), fmt)
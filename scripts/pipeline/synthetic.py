@@ -0,0 +1,121 @@
+"""
+Synthetic cement data for benchmarks and tests.
+
+Makes tables of any size that look like data/Paper_Data.xlsx: the same
+21 columns, realistic value ranges, and every row consistent (exports
+north + south = total exports, local + exports = production). Rows cycle
+through the fiscal years 1991-2022, as if many plants reported.
+
+    df = synthetic_frame(1_000_000)               # raw Excel column names
+    write_workbook(df, "big.xlsx")               # 2-row header: names + units
+    stage_input = synthetic_stage_input(1_000_000)  # what 01_first_analysis.py outputs
+
+An Excel sheet holds at most 1,048,576 rows, so write_workbook() starts
+a new sheet when one is full.
+"""
+
+from pipeline.bootstrap import np, pd
+from pipeline.column_resolver import resolve_columns
+from pipeline.emissions import compute_scopes
+
+# Excel's row limit minus the two header rows
+MAX_SHEET_ROWS = 1_048_576 - 2
+
+FIRST_YEAR = 1991
+LAST_YEAR = 2022
+
+# (column name, unit) of the two header rows, in the order of Paper_Data.xlsx
+HEADER = [
+    ("Fiscal Year - July - June", ""),
+    ("Total Cement Production", "Tons"),
+    ("Local dispatches (North, South)", "Tons"),
+    ("Total Exports", "Tons"),
+    ("Exports (South)", "Tons"),
+    ("Exports (North)", "Tons"),
+    ("Coal intensity", "kg coal / ton cement"),
+    ("Electricity intensity", "kWh / ton cement"),
+    ("Clinker ratio", "%"),
+    ("Coal parameters: NCV", "GJ / t"),
+    ("Coal parameters: CO2 combustion EF", "tCO2 / TJ"),
+    ("Coal parameters: Oxidized carbon fraction", ""),
+    ("Calcination emission factor", "tCO2 / ton clinker"),
+    ("Grid electricity EF", "kgCO2 / kWh"),
+    ("Truck capacity - Allowed Load", "Tons"),
+    ("Truck capacity - Over Load", "Tons"),
+    ("Truck emission factor - Allowed", "g CO2 / km"),
+    ("Truck emission factor - OverLoad", "g CO2 / km"),
+    ("Local Transport distances", "km"),
+    ("North Export Transport distances", "km"),
+    ("South Export Transport distances", "km"),
+]
+
+
+def column_names():
+    """The column names after the two header rows are flattened ('name_unit')."""
+    return [f"{name}_{unit}" if unit else name for name, unit in HEADER]
+
+
+def synthetic_frame(n_rows, seed=0):
+    """A DataFrame of `n_rows` rows with the flattened Paper_Data.xlsx column names."""
+    rng = np.random.default_rng(seed)
+    years = FIRST_YEAR + np.arange(n_rows) % (LAST_YEAR - FIRST_YEAR + 1)
+
+    cement = rng.uniform(7.0e6, 5.8e7, n_rows).round()
+    exports = (cement * rng.uniform(0.0, 0.2, n_rows)).round()
+    exports_south = (exports * rng.uniform(0.3, 0.7, n_rows)).round()
+
+    values = [
+        years,
+        cement,
+        cement - exports,
+        exports,
+        exports_south,
+        exports - exports_south,
+        rng.uniform(130, 190, n_rows).round(),
+        rng.uniform(100, 120, n_rows).round(),
+        rng.uniform(0.88, 0.96, n_rows),
+        np.full(n_rows, 25.8),
+        np.full(n_rows, 94.6),
+        np.ones(n_rows),
+        rng.uniform(0.50, 0.54, n_rows),
+        rng.uniform(0.67, 0.77, n_rows),
+        np.full(n_rows, 29.5),
+        np.full(n_rows, 39.5),
+        np.full(n_rows, 931.03),
+        np.full(n_rows, 1421.05),
+        rng.choice([300.0, 500.0, 700.0], n_rows),
+        rng.choice([800.0, 1000.0, 1200.0], n_rows),
+        rng.choice([150.0, 200.0, 250.0], n_rows),
+    ]
+    df = pd.DataFrame(dict(zip(column_names(), values)))
+    df.attrs["units"] = {column: unit for column, (_, unit) in zip(column_names(), HEADER) if unit}
+    return df
+
+
+def synthetic_stage_input(n_rows, seed=0):
+    """The table 01_first_analysis.py would produce: canonical column names plus Scope 1/2/3."""
+    df = synthetic_frame(n_rows, seed)
+    mapping, _ = resolve_columns(df.columns)
+    return compute_scopes(df.rename(columns=mapping))
+
+
+def write_workbook(df, path, sheet_rows=MAX_SHEET_ROWS):
+    """
+    Save `df` (from synthetic_frame) as an .xlsx file with the 2-row header.
+
+    Uses openpyxl's write-only mode, so rows are streamed to the file.
+    Every `sheet_rows` rows a new sheet is started ("Data", "Data 2", ...).
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    names = [name for name, _ in HEADER]
+    units = [unit for _, unit in HEADER]
+    for sheet_number, start in enumerate(range(0, max(len(df), 1), sheet_rows), start=1):
+        sheet = workbook.create_sheet("Data" if sheet_number == 1 else f"Data {sheet_number}")
+        sheet.append(names)
+        sheet.append(units)
+        for row in df.iloc[start:start + sheet_rows].itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+    return path
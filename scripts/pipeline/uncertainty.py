@@ -0,0 +1,208 @@
+"""
+Monte Carlo uncertainty bands for the Scope 1/2/3 emissions.
+
+Give a distribution for each uncertain input column. Each distribution is
+a multiplier on the column's value in the data:
+
+    "ncv":                ("normal", 0.05)              # mean 1, sd 5%
+    "co2_ef_tco2_per_tj": ("uniform", 0.95, 1.05)       # 95%..105%
+    "oxid_frac":          ("triangular", 0.97, 1.0, 1.0)
+    "ef_over_gpkm":       ("lognormal", 0.10)           # sigma of log
+
+Samples are drawn as (samples x years) arrays and pushed through the same
+formulas as emissions.compute_scopes(). Draws happen in chunks, spread over
+a process pool, and each chunk is reduced right away to a running sum (for
+the mean) and a histogram per year and output (for the percentiles), so
+memory is bounded by chunk_size and `bins`, not by n_samples:
+
+    chunk_size x years x 8 bytes per worker, for the draws
+    years x outputs x (bins + 2) x 8 bytes, for the histograms
+
+The histogram range comes from the first chunk, with half its spread
+added on both sides; percentiles are read off the histograms with linear
+interpolation, so they are accurate to a small part of a bin (the spread
+of the first chunk / bins). When all samples fit in one chunk the
+percentiles are exact.
+
+By default one multiplier is drawn per sample and used for every year
+(the factor is uncertain, but the same in each year). Use
+independent_years=True to draw a new multiplier per year.
+
+Usage:
+    bands = monte_carlo(df, {"ncv": ("normal", 0.05)}, n_samples=1_000_000)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline.bootstrap import np, pd
+from pipeline.emissions import REQUIRED_COLUMNS, missing_columns, scope_arrays
+
+DEFAULT_OUTPUTS = ("scope1_t", "scope2_t", "scope3_t", "total_t")
+DEFAULT_PERCENTILES = (2.5, 50.0, 97.5)
+DEFAULT_BINS = 1000
+
+
+def draw_multipliers(rng, spec, shape):
+    """Draw multipliers of `shape` for one distribution spec (see module docstring)."""
+    kind, *args = spec
+    if kind == "normal":
+        (rel_sd,) = args
+        return rng.normal(1.0, rel_sd, shape)
+    if kind == "uniform":
+        low, high = args
+        return rng.uniform(low, high, shape)
+    if kind == "triangular":
+        low, mode, high = args
+        return rng.triangular(low, mode, high, shape)
+    if kind == "lognormal":
+        (sigma,) = args
+        # Median 1, so the data value stays the central estimate
+        return rng.lognormal(0.0, sigma, shape)
+    raise ValueError(f"Unknown distribution '{kind}'. Use normal, uniform, triangular or lognormal.")
+
+
+def _simulate_chunk(base, distributions, n, seed, independent_years, outputs, settings):
+    """Run `n` samples and return {output: array of shape (years, n)}."""
+    rng = np.random.default_rng(seed)
+    n_years = len(next(iter(base.values())))
+    shape = (n, n_years) if independent_years else (n, 1)
+
+    col = {}
+    for name, values in base.items():
+        if name in distributions:
+            col[name] = values[None, :] * draw_multipliers(rng, distributions[name], shape)
+        else:
+            col[name] = values[None, :]
+
+    out = scope_arrays(col, **settings)
+    # Years x samples, so each year's samples are contiguous
+    return {name: np.broadcast_to(out[name], (n, n_years)).T for name in outputs}
+
+
+def _histogram_edges(values, bins):
+    """Per-row (low, bin width) for histograms covering `values` (years x samples) with room to spare."""
+    low, high = values.min(axis=1), values.max(axis=1)
+    spread = high - low
+    low = low - spread / 2
+    width = 2 * spread / bins
+    # Constant rows (no uncertain input affects them): any width works, the result is clipped to min/max
+    width = np.where(width > 0, width, np.maximum(np.abs(low), 1.0) * 1e-9)
+    return low, width
+
+
+def _reduce_chunk(values, edges, bins):
+    """Summarise samples (years x n) as (sum, min, max, counts of shape (years, bins + 2))."""
+    low, width = edges
+    n_years = values.shape[0]
+    # Bin 0 collects values below the range, bin bins + 1 values above it
+    index = np.clip(np.floor((values - low[:, None]) / width[:, None]), -1, bins).astype(np.int64) + 1
+    index += (np.arange(n_years) * (bins + 2))[:, None]
+    counts = np.bincount(index.ravel(), minlength=n_years * (bins + 2)).reshape(n_years, bins + 2)
+    return values.sum(axis=1, dtype=np.float64), values.min(axis=1), values.max(axis=1), counts
+
+
+def _simulate_and_reduce(edges, bins, *task):
+    chunk = _simulate_chunk(*task)
+    return {name: _reduce_chunk(values, edges[name], bins) for name, values in chunk.items()}
+
+
+def _histogram_percentiles(counts, low, width, minimum, maximum, percentiles):
+    """Percentiles (len(percentiles) x years) from per-row histograms, like np.percentile's linear method."""
+    n_years, n_bins = counts.shape
+    bins = n_bins - 2
+    # Left and right edge of every bin; the outer bins reach to the smallest/largest sample
+    inner = low[:, None] + width[:, None] * np.arange(bins + 1)
+    lefts = np.column_stack([minimum, inner])
+    rights = np.column_stack([inner, maximum])
+    cumulative = counts.cumsum(axis=1)
+    total = cumulative[:, -1]
+    rows = np.arange(n_years)
+
+    bands = []
+    for p in percentiles:
+        rank = p / 100 * (total - 1)
+        # The bin holding the sample at `rank`, then the position within it
+        index = (cumulative <= rank[:, None]).sum(axis=1).clip(max=n_bins - 1)
+        before = cumulative[rows, index] - counts[rows, index]
+        fraction = np.clip((rank - before + 0.5) / np.maximum(counts[rows, index], 1), 0.0, 1.0)
+        value = lefts[rows, index] + fraction * (rights[rows, index] - lefts[rows, index])
+        bands.append(np.clip(value, minimum, maximum))
+    return np.array(bands)
+
+
+def monte_carlo(df, distributions, n_samples=10_000, chunk_size=50_000, workers=None,
+                seed=0, independent_years=False, percentiles=DEFAULT_PERCENTILES,
+                outputs=DEFAULT_OUTPUTS, id_column="year", bins=DEFAULT_BINS,
+                calc_ef_is_per_clinker=True, overload_frac=0.60, allowed_frac=0.40):
+    """
+    Return percentile bands of the emissions under uncertain inputs.
+
+    The result has one row per year (or row of `df`) and output, with
+    columns: id_column, output, mean, and p<percentile> for each percentile.
+    workers=None uses every CPU; workers=1 runs without a process pool.
+    Results are the same for a given seed whatever the number of workers.
+    Memory does not grow with n_samples (see module docstring); `bins`
+    sets the histogram resolution of the percentiles.
+    """
+    missing = missing_columns(df)
+    if missing:
+        raise KeyError(f"Missing columns for emissions calculation: {missing}")
+    unknown = set(distributions) - set(REQUIRED_COLUMNS)
+    if unknown:
+        raise ValueError(f"Distributions given for unknown columns: {sorted(unknown)}")
+
+    base = {name: df[name].to_numpy(dtype=np.float64) for name in REQUIRED_COLUMNS}
+    settings = {
+        "calc_ef_is_per_clinker": calc_ef_is_per_clinker,
+        "overload_frac": overload_frac,
+        "allowed_frac": allowed_frac,
+    }
+
+    chunk_sizes = [min(chunk_size, n_samples - start) for start in range(0, n_samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [
+        (base, distributions, n, chunk_seed, independent_years, outputs, settings)
+        for n, chunk_seed in zip(chunk_sizes, seeds)
+    ]
+
+    ids = df[id_column].to_numpy() if id_column in df.columns else np.arange(len(df))
+
+    def band_frame(name, mean, bands):
+        frame = pd.DataFrame({id_column: ids, "output": name, "mean": mean})
+        for p, band in zip(percentiles, bands):
+            frame[f"p{p:g}"] = band
+        return frame
+
+    # The first chunk sets the histogram ranges, so it is simulated here
+    first = _simulate_chunk(*tasks[0])
+    if len(tasks) == 1:
+        # Everything fits in one chunk: exact percentiles
+        return pd.concat([band_frame(name, values.mean(axis=1), np.percentile(values, percentiles, axis=1))
+                          for name, values in first.items()], ignore_index=True)
+
+    edges = {name: _histogram_edges(values, bins) for name, values in first.items()}
+    totals = {name: _reduce_chunk(values, edges[name], bins) for name, values in first.items()}
+    del first
+
+    def add(chunk):
+        for name, (total, low, high, counts) in chunk.items():
+            sums, lows, highs, all_counts = totals[name]
+            totals[name] = (sums + total, np.minimum(lows, low), np.maximum(highs, high), all_counts + counts)
+
+    workers = workers or os.cpu_count() or 1
+    rest = [(edges, bins) + task for task in tasks[1:]]
+    if workers == 1:
+        for task in rest:
+            add(_simulate_and_reduce(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in pool.map(_simulate_and_reduce, *zip(*rest)):
+                add(chunk)
+
+    rows = []
+    for name in outputs:
+        sums, lows, highs, counts = totals.pop(name)
+        bands = _histogram_percentiles(counts, edges[name][0], edges[name][1], lows, highs, percentiles)
+        rows.append(band_frame(name, sums / n_samples, bands))
+    return pd.concat(rows, ignore_index=True)
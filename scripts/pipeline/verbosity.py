@@ -0,0 +1,67 @@
+"""
+How much the scripts print.
+
+Four levels, chosen with the PIPELINE_VERBOSITY environment variable
+(or run_pipeline.py --verbosity):
+
+    quiet    only problems and results that need attention
+    batch    one line per step: what is running, rows, where it was saved (default)
+    verbose  also column lists and the column mapping
+    debug    also previews of the tables (df.head(), dtypes, raw Excel rows)
+
+    PIPELINE_VERBOSITY=debug python scripts/01_first_analysis.py
+
+Printing a DataFrame builds a large string, which is slow for wide tables.
+Guard such prints with enabled(), so the text is never built when it
+would not be shown:
+
+    log(f"Loaded {len(df)} rows")                       # batch and above
+    if enabled(DEBUG):
+        log(f"First rows:\\n{df.head()}", DEBUG)
+"""
+
+import os
+
+VERBOSITY_ENV_VAR = "PIPELINE_VERBOSITY"
+
+QUIET, BATCH, VERBOSE, DEBUG = 0, 1, 2, 3
+LEVELS = {"quiet": QUIET, "batch": BATCH, "verbose": VERBOSE, "debug": DEBUG}
+DEFAULT_LEVEL = BATCH
+
+
+def verbosity():
+    """The current level, from $PIPELINE_VERBOSITY (a name or a number 0-3)."""
+    value = os.environ.get(VERBOSITY_ENV_VAR, "").strip().lower()
+    if not value:
+        return DEFAULT_LEVEL
+    if value.isdigit():
+        return min(int(value), DEBUG)
+    if value not in LEVELS:
+        raise ValueError(f"Unknown {VERBOSITY_ENV_VAR} '{value}'. Choose from: {list(LEVELS)}")
+    return LEVELS[value]
+
+
+def set_verbosity(level):
+    """Set the level for this process and the worker processes it starts."""
+    if isinstance(level, str):
+        level = LEVELS[level.lower()]
+    os.environ[VERBOSITY_ENV_VAR] = str(level)
+
+
+def enabled(level):
+    """True if messages of this level are shown."""
+    return verbosity() >= level
+
+
+def log(message="", level=BATCH):
+    """Print `message` if the current verbosity is at least `level`."""
+    if enabled(level):
+        print(message)
+
+
+def banner(title, level=BATCH):
+    """Print a section title between two lines of '='."""
+    if enabled(level):
+        print("=" * 80)
+        print(title)
+        print("=" * 80)
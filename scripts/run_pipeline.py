@@ -0,0 +1,91 @@
+"""
+Run all numbered pipeline scripts in one go.
+
+Instead of starting Python 22 times, this imports every script once and
+passes each table straight to the next script in memory. At the end it
+prints how long each script took and how much memory it used, and saves
+the numbers to outputs/run_report.json.
+
+Usage:
+    python scripts/run_pipeline.py                  # run 01 → 22
+    python scripts/run_pipeline.py --from 5 --to 9  # run only scripts 05-09
+    python scripts/run_pipeline.py --checkpoint     # also save every in-between table
+    python scripts/run_pipeline.py --format csv     # same as PIPELINE_FORMAT=csv
+    python scripts/run_pipeline.py --jobs 4         # run independent scripts in parallel
+    python scripts/run_pipeline.py --incremental    # only rerun scripts affected by your edits
+    python scripts/run_pipeline.py --chunk-rows 1000000  # stream big tables through chunk-ready scripts
+    python scripts/run_pipeline.py --compact        # store tables as float32 / small ints / categories
+    python scripts/run_pipeline.py --verbosity quiet  # print only problems (also: batch, verbose, debug)
+    python scripts/run_pipeline.py --memo           # reuse results of unchanged scripts from earlier runs
+"""
+
+import argparse
+import os
+import time
+
+from pipeline.dtypes import COMPACT_ENV_VAR, DEFAULT_FLOAT_TOLERANCE
+from pipeline.instrument import print_summary, write_report
+from pipeline.memo import DEFAULT_MAX_MB, MEMO_ENV_VAR
+from pipeline.runner import discover_stages, run_pipeline, stage_number
+from pipeline.verbosity import BATCH, LEVELS, banner, enabled, log, set_verbosity
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the numbered pipeline scripts in one process.")
+    parser.add_argument("--from", dest="first", type=int, default=1, help="first script number to run")
+    parser.add_argument("--to", dest="last", type=int, default=99, help="last script number to run")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="save every stage's table to outputs/, not just the final ones")
+    parser.add_argument("--format", choices=["parquet", "feather", "csv"],
+                        help="file format for saved tables (default: $PIPELINE_FORMAT or parquet)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of worker processes for stages that don't depend on each other")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip scripts whose code, settings and inputs are unchanged since the last run")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="process tables in chunks of this many rows in scripts that allow it "
+                             "(ROW_LOCAL = True or a combine() function)")
+    parser.add_argument("--compact", nargs="?", type=float, const=DEFAULT_FLOAT_TOLERANCE, default=None,
+                        metavar="TOLERANCE",
+                        help="shrink tables to compact dtypes; floats become float32 if no value changes "
+                             f"by more than TOLERANCE (relative, default {DEFAULT_FLOAT_TOLERANCE:g})")
+    parser.add_argument("--memo", nargs="?", type=float, const=DEFAULT_MAX_MB, default=None, metavar="MB",
+                        help="remember every script's result in outputs/cache/stages/ and reuse it while the "
+                             "script, its settings and inputs are unchanged; the least recently used results "
+                             f"are deleted above MB megabytes (default {DEFAULT_MAX_MB})")
+    parser.add_argument("--verbosity", choices=list(LEVELS), default=None,
+                        help="how much the scripts print: quiet, batch, verbose or debug "
+                             "(default: $PIPELINE_VERBOSITY or batch; debug prints table previews)")
+    args = parser.parse_args()
+
+    if args.verbosity is not None:
+        # Also an environment variable, for the worker processes
+        set_verbosity(args.verbosity)
+
+    if args.compact is not None:
+        # An environment variable, so the worker processes (--jobs) see it too
+        os.environ[COMPACT_ENV_VAR] = repr(args.compact)
+    if args.memo is not None:
+        os.environ[MEMO_ENV_VAR] = repr(args.memo)
+
+    stages = [path for path in discover_stages() if args.first <= stage_number(path) <= args.last]
+    if not stages:
+        print("No pipeline scripts found in that range.")
+        exit(1)
+
+    start = time.perf_counter()
+    report = run_pipeline(stages, checkpoint=args.checkpoint, fmt=args.format, jobs=args.jobs,
+                          incremental=args.incremental, chunk_rows=args.chunk_rows)
+    total_seconds = time.perf_counter() - start
+
+    log()
+    banner("PIPELINE SUMMARY")
+    if enabled(BATCH):
+        print_summary(report.values(), total_seconds)
+
+    report_path = write_report(report.values(), total_s=total_seconds, settings=vars(args))
+    log(f"\n✓ Saved run report to: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
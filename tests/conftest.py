@@ -0,0 +1,39 @@
+"""
+Shared setup for the tests: the pipeline helpers are imported from
+scripts/pipeline/, like the scripts themselves do.
+
+    pip install pytest
+    python -m pytest
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+# One plant-year with round numbers, so every emission can be worked out by hand
+# (see test_emissions.py)
+HAND_ROW = {
+    "year": 2000,
+    "cement_t": 1000.0, "local_t": 500.0, "exp_n_t": 300.0, "exp_s_t": 200.0,
+    "coal_int_kgpt": 100.0, "ncv": 25.0, "co2_ef_tco2_per_tj": 100.0, "oxid_frac": 1.0,
+    "calc_ef": 0.5, "clinker_ratio": 0.8,
+    "elec_int_kwhpt": 100.0, "grid_ef_kg_per_kwh": 0.5,
+    "cap_allowed_t": 20.0, "cap_over_t": 40.0, "ef_allowed_gpkm": 1000.0, "ef_over_gpkm": 1600.0,
+    "dist_local_km": 100.0, "dist_exp_n_km": 1000.0, "dist_exp_s_km": 500.0,
+}
+
+
+@pytest.fixture
+def plant_years():
+    """Three years of canonical input columns: HAND_ROW with production growing each year."""
+    rows = []
+    for i in range(3):
+        row = dict(HAND_ROW, year=2000 + i)
+        for name in ("cement_t", "local_t", "exp_n_t", "exp_s_t"):
+            row[name] = HAND_ROW[name] * (1 + 0.1 * i)
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,71 @@
+"""compute_scopes() against a row worked out by hand, and scenario sweeps against one run per scenario."""
+
+import pandas as pd
+import pytest
+from conftest import HAND_ROW
+
+from pipeline.emissions import SCOPE_COLUMNS, compute_scopes
+from pipeline.scenarios import run_scenarios, scenario_grid
+
+# For HAND_ROW, with 60% of the trucks overloaded:
+#   combustion   1000 t * 100 kg/t = 100 t coal -> * 25 GJ/t = 2.5 TJ -> * 100 tCO2/TJ * 1.0 = 250
+#   calcination  1000 t * 0.8 clinker * 0.5                                              = 400
+#   grid         1000 t * 100 kWh/t * 0.5 kg/kWh / 1000                                  =  50
+#   trucks       0.4 * 1000 g/km / 20 t + 0.6 * 1600 g/km / 40 t = 44 g per t-km
+#                local 500 t * 100 km, north 300 t * 1000 km, south 200 t * 500 km (* 44 / 1e6)
+EXPECTED = {
+    "scope1_combustion_t": 250.0,
+    "scope1_calcination_t": 400.0,
+    "scope1_t": 650.0,
+    "scope2_t": 50.0,
+    "scope3_local_t": 2.2,
+    "scope3_exp_n_t": 13.2,
+    "scope3_exp_s_t": 4.4,
+    "scope3_t": 19.8,
+    "total_t": 719.8,
+}
+
+
+def test_compute_scopes_matches_hand_calculation():
+    result = compute_scopes(pd.DataFrame([HAND_ROW]), calc_ef_is_per_clinker=True,
+                            overload_frac=0.6, allowed_frac=0.4)
+    for name, expected in EXPECTED.items():
+        assert result[name].iloc[0] == pytest.approx(expected, rel=1e-12), name
+    assert result.attrs["units"]["total_t"] == "tCO2"
+
+
+def test_calcination_per_ton_cement():
+    result = compute_scopes(pd.DataFrame([HAND_ROW]), calc_ef_is_per_clinker=False)
+    assert result["scope1_calcination_t"].iloc[0] == pytest.approx(1000 * 0.5)
+
+
+def test_compute_scopes_needs_every_column():
+    with pytest.raises(KeyError, match="cement_t"):
+        compute_scopes(pd.DataFrame([HAND_ROW]).drop(columns="cement_t"))
+
+
+def test_scenarios_match_one_run_per_scenario(plant_years):
+    params = {
+        "overload_frac": [0.4, 0.6, 0.8],
+        "grid_ef_kg_per_kwh": [0.45, 0.71],
+        "calc_ef_is_per_clinker": [True, False],
+        "distances": {
+            "base": {},
+            "far": {"dist_local_km": 700, "dist_exp_n_km": 1200, "dist_exp_s_km": 300},
+        },
+    }
+    # A small batch_size, so scenarios are spread over several batches
+    results = run_scenarios(plant_years, params, batch_size=5)
+    _, overrides = scenario_grid(params)
+    assert len(results) == len(overrides) * len(plant_years)
+
+    for scenario, override in enumerate(overrides):
+        settings = {name: override.pop(name) for name in ("overload_frac", "calc_ef_is_per_clinker")}
+        expected = compute_scopes(plant_years.assign(**override),
+                                  calc_ef_is_per_clinker=settings["calc_ef_is_per_clinker"],
+                                  overload_frac=settings["overload_frac"],
+                                  allowed_frac=1 - settings["overload_frac"])
+        got = results[results["scenario"] == scenario]
+        assert got["year"].tolist() == plant_years["year"].tolist()
+        for name in SCOPE_COLUMNS:
+            assert got[name].to_numpy() == pytest.approx(expected[name].to_numpy(), rel=1e-12), (scenario, name)
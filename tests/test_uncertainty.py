@@ -0,0 +1,82 @@
+"""Monte Carlo bands: histogram percentiles against np.percentile on the same draws."""
+
+import numpy as np
+import pytest
+
+from pipeline.emissions import REQUIRED_COLUMNS
+from pipeline.uncertainty import (_histogram_edges, _histogram_percentiles, _reduce_chunk, _simulate_chunk,
+                                  monte_carlo)
+
+PERCENTILES = (2.5, 50.0, 97.5)
+BINS = 1000
+DISTRIBUTIONS = {
+    "ncv": ("normal", 0.05),
+    "co2_ef_tco2_per_tj": ("uniform", 0.95, 1.05),
+    "ef_over_gpkm": ("lognormal", 0.10),
+}
+
+
+def test_histogram_percentiles_match_numpy():
+    # Three rows with different shapes: symmetric, skewed and constant
+    rng = np.random.default_rng(42)
+    values = np.vstack([rng.normal(100.0, 5.0, 200_000),
+                        rng.lognormal(0.0, 0.5, 200_000),
+                        np.full(200_000, 7.0)])
+    chunks = np.split(values, 8, axis=1)
+
+    edges = _histogram_edges(chunks[0], BINS)
+    sums, lows, highs, counts = _reduce_chunk(chunks[0], edges, BINS)
+    for chunk in chunks[1:]:
+        chunk_sum, low, high, chunk_counts = _reduce_chunk(chunk, edges, BINS)
+        sums, counts = sums + chunk_sum, counts + chunk_counts
+        lows, highs = np.minimum(lows, low), np.maximum(highs, high)
+
+    got = _histogram_percentiles(counts, edges[0], edges[1], lows, highs, PERCENTILES)
+    expected = np.percentile(values, PERCENTILES, axis=1)
+    # Tolerance: one histogram bin of the row (the range of the first chunk, doubled, / BINS)
+    assert np.all(np.abs(got - expected) <= edges[1])
+    assert sums / values.shape[1] == pytest.approx(values.mean(axis=1), rel=1e-12)
+
+
+def test_monte_carlo_bands_match_numpy_on_the_same_draws(plant_years):
+    n_samples, chunk_size, seed = 40_000, 10_000, 7
+    bands = monte_carlo(plant_years, DISTRIBUTIONS, n_samples=n_samples, chunk_size=chunk_size,
+                        workers=1, seed=seed, percentiles=PERCENTILES, bins=BINS)
+
+    # Draw the same chunks again (same seeds) and keep every sample
+    base = {name: plant_years[name].to_numpy(dtype=np.float64) for name in REQUIRED_COLUMNS}
+    settings = {"calc_ef_is_per_clinker": True, "overload_frac": 0.60, "allowed_frac": 0.40}
+    seeds = np.random.SeedSequence(seed).spawn(n_samples // chunk_size)
+    chunks = [
+        _simulate_chunk(base, DISTRIBUTIONS, chunk_size, chunk_seed, False, ("total_t",), settings)["total_t"]
+        for chunk_seed in seeds
+    ]
+    samples = np.hstack(chunks)
+
+    total = bands[bands["output"] == "total_t"]
+    assert total["year"].tolist() == plant_years["year"].tolist()
+    assert total["mean"].to_numpy() == pytest.approx(samples.mean(axis=1), rel=1e-12)
+    # Percentiles from the histograms: within one bin (set by the first chunk) of the exact ones
+    _, width = _histogram_edges(chunks[0], BINS)
+    for p, exact in zip(PERCENTILES, np.percentile(samples, PERCENTILES, axis=1)):
+        assert np.all(np.abs(total[f"p{p:g}"].to_numpy() - exact) <= width), p
+
+
+def test_monte_carlo_single_chunk_is_exact(plant_years):
+    bands = monte_carlo(plant_years, DISTRIBUTIONS, n_samples=5_000, chunk_size=5_000, workers=1, seed=3,
+                        percentiles=PERCENTILES)
+    base = {name: plant_years[name].to_numpy(dtype=np.float64) for name in REQUIRED_COLUMNS}
+    settings = {"calc_ef_is_per_clinker": True, "overload_frac": 0.60, "allowed_frac": 0.40}
+    (chunk_seed,) = np.random.SeedSequence(3).spawn(1)
+    samples = _simulate_chunk(base, DISTRIBUTIONS, 5_000, chunk_seed, False, ("scope1_t",), settings)["scope1_t"]
+
+    scope1 = bands[bands["output"] == "scope1_t"]
+    for p, exact in zip(PERCENTILES, np.percentile(samples, PERCENTILES, axis=1)):
+        assert scope1[f"p{p:g}"].to_numpy() == pytest.approx(exact, rel=1e-12)
+
+
+def test_monte_carlo_does_not_depend_on_workers(plant_years):
+    kwargs = dict(n_samples=20_000, chunk_size=5_000, seed=11, percentiles=PERCENTILES)
+    one = monte_carlo(plant_years, DISTRIBUTIONS, workers=1, **kwargs)
+    two = monte_carlo(plant_years, DISTRIBUTIONS, workers=2, **kwargs)
+    assert one.equals(two)